@@ -0,0 +1,95 @@
+"""
+      Library and command line access to the calculation, without the
+      interface. Importing this module has no side effects and does not
+      load tkinter or sympy.
+
+      python analysis.py edges.txt --noise 0 --engine exact --json
+"""
+
+# IMPORT MODULES ==============================================================
+import argparse
+import contextlib
+import json
+import sys
+import numpy as np
+
+from dfs import dfs, ENGINES
+from loaders import load_network
+from network_to_matrix import edges_to_matrix
+
+#==============================================================================
+
+def analyse(edges, noise, n_nodes=None, engine="spectral", sparse=False, verbose=False,
+            hooks=None):
+    """
+    Runs network -> dfs for a list of couplings between nodes (labelled
+    from 0) and the nodes coupled to noise. Returns Wdf_dim, W_df and the
+    subspaces affected by noise, as dfs.propagation does. hooks are passed
+    on to dfs (see dfs.add_hook and instrument.py).
+    """
+    Q, V_0 = edges_to_matrix(edges, noise, n_nodes, sparse)
+    return dfs(Q, V_0, verbose, hooks).solve(engine)
+
+
+def to_dict(Wdf_dim, W_df, subspaces):
+    """
+    Result as plain python types, so it can be written as JSON. Vectors are
+    lists of floats, one list per vector.
+    """
+    return {
+        "Wdf_dim": int(Wdf_dim),
+        "W_df": [] if W_df is None else np.asarray(W_df, dtype=float).tolist(),
+        "subspaces": np.asarray(subspaces, dtype=float).tolist(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Find the decoherence free subspace of an oscillator network.")
+    parser.add_argument("edges", help="edge list file with one 'node1 node2' per line, "
+                        "or a .mtx, .npy or .npz file (see loaders.py)")
+    parser.add_argument("--noise", type=int, nargs="*", default=[],
+                        help="nodes coupled to noise, as well as any in the file")
+    parser.add_argument("--nodes", type=int, default=None,
+                        help="number of nodes (default: largest label + 1)")
+    parser.add_argument("--engine", choices=sorted(ENGINES), default="spectral")
+    parser.add_argument("--dense", action="store_true",
+                        help="store Q as a dense N x N array (default: sparse)")
+    parser.add_argument("--dimension-only", action="store_true",
+                        help="only find the dimension of W_df, modulo primes (integer Q only)")
+    parser.add_argument("--json", action="store_true", help="print the result as JSON")
+    parser.add_argument("--verbose", action="store_true",
+                        help="print the working as well, to stderr")
+    parser.add_argument("--events", action="store_true",
+                        help="write timing and progress events to stderr as JSON lines")
+    args = parser.parse_args(argv)
+
+    hooks = []
+    if args.events:
+        from instrument import event_log
+        hooks.append(event_log(sys.stderr))
+    Q, V_0 = load_network(args.edges, args.noise, args.nodes, not args.dense)
+    if args.dimension_only:
+        Wdf_dim = dfs(Q, V_0, False, hooks).modular_dimension()
+        if args.json:
+            json.dump({"Wdf_dim": int(Wdf_dim)}, sys.stdout)
+            print()
+        else:
+            print("The decoherence free subspace has dimension %d."%(Wdf_dim))
+        return 0
+    # the working goes to stderr, so stdout holds only the result (or JSON)
+    with contextlib.redirect_stdout(sys.stderr):
+        result = dfs(Q, V_0, args.verbose, hooks).solve(args.engine)
+    if args.json:
+        json.dump(to_dict(*result), sys.stdout)
+        print()
+    elif args.verbose == False: # otherwise the working ends with this already
+        if result[0] == 0:
+            print("There is no decoherence free subspace.")
+        else:
+            print("There is a decoherence free subspace of dimension %d."%(result[0]))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
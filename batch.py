@@ -0,0 +1,106 @@
+"""
+      Runs dfs on many networks at once, using a pool of worker processes.
+      Results are yielded as soon as each network is finished.
+"""
+
+# IMPORT MODULES ==============================================================
+import multiprocessing
+from multiprocessing import shared_memory
+import numpy as np
+
+from dfs import dfs
+
+#==============================================================================
+
+_shared = {} # set in each worker by _attach
+
+
+def share(Q):
+    """
+    Copies Q (dense or CSR) into shared memory. Returns the blocks, which
+    the caller must close and unlink, and a description of them which is
+    small enough to send to each worker.
+    """
+    if hasattr(Q, "tocsr"):
+        Q = Q.tocsr()
+        arrays = {"data": Q.data, "indices": Q.indices, "indptr": Q.indptr}
+        layout = ("csr", Q.shape)
+    else:
+        arrays = {"dense": np.ascontiguousarray(Q)}
+        layout = ("dense", Q.shape)
+    blocks = []
+    description = {}
+    for key, array in arrays.items():
+        block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, array.dtype, buffer=block.buf)[...] = array
+        blocks.append(block)
+        description[key] = (block.name, array.shape, array.dtype.str)
+    return blocks, (layout, description)
+
+
+def attach(shared):
+    """
+    Rebuilds Q from the description made by share, without copying it.
+    Returns Q and the blocks, which must be kept open while Q is in use.
+    """
+    (kind, shape), description = shared
+    blocks = []
+    arrays = {}
+    for key, (name, array_shape, dtype) in description.items():
+        block = shared_memory.SharedMemory(name=name)
+        blocks.append(block)
+        arrays[key] = np.ndarray(array_shape, np.dtype(dtype), buffer=block.buf)
+    if kind == "csr":
+        from scipy import sparse
+        Q = sparse.csr_matrix((arrays["data"], arrays["indices"], arrays["indptr"]),
+                              shape=shape, copy=False)
+    else:
+        Q = arrays["dense"]
+    return Q, blocks
+
+
+def _attach(shared, engine, settings=None):
+    """
+    Worker initialiser, stores the shared Q, the engine to run and any
+    other settings (placement.py uses it for its search).
+    """
+    _shared["engine"] = engine
+    _shared.update(settings or {})
+    if shared is not None:
+        _shared["Q"], _shared["blocks"] = attach(shared)
+
+
+def _work(task):
+    index, network = task
+    if "Q" in _shared:
+        Q, V_0 = _shared["Q"], network
+    else:
+        Q, V_0 = network
+    Wdf_dim, W_df, subspaces = dfs(Q, V_0, verbose=False).solve(_shared["engine"])
+    return index, Wdf_dim, W_df, subspaces
+
+
+def run_batch(networks, Q=None, engine="spectral", processes=None, chunksize=1):
+    """
+    Solves every network on a process pool, yielding (index, Wdf_dim, W_df,
+    subspaces) in the order they finish, where index is the position of
+    the network in networks.
+
+    networks is an iterable of (Q, V_0) pairs. When many networks share one
+    Q, for example when sweeping the noise couplings, pass it as Q and give
+    only the V_0s in networks; Q is then put in shared memory once instead
+    of being sent with every task.
+    """
+    blocks = []
+    shared = None
+    if Q is not None:
+        blocks, shared = share(Q)
+    try:
+        with multiprocessing.Pool(processes, initializer=_attach,
+                                  initargs=(shared, engine)) as pool:
+            for result in pool.imap_unordered(_work, enumerate(networks), chunksize):
+                yield result
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
@@ -0,0 +1,236 @@
+"""
+      Benchmark suite for network and dfs. Builds standard networks of
+      increasing size (see generators.py), times every stage of the
+      calculation with each engine, measures peak memory and writes the
+      results as JSON lines so that two versions can be compared.
+
+      python benchmark.py --sizes 16 64 256 --output new.jsonl
+      python benchmark.py --compare old.jsonl new.jsonl
+
+      propagation is left out by default, as it takes minutes beyond N ~ 64.
+
+      Every engine's Wdf_dim is checked against modular_dimension (or the
+      first engine, for networks that are not integer). Disagreements are
+      listed at the end and the exit status is 1: the time of a wrong
+      answer means nothing. --strict stops at the first one.
+"""
+
+# IMPORT MODULES ==============================================================
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+import numpy as np
+
+import generators
+from dfs import dfs, ENGINES
+
+#==============================================================================
+
+def noise_nodes(N, count):
+    """
+    count nodes spread evenly through the labels, starting at node 0.
+    """
+    return sorted(set(np.linspace(0, N-1, max(count, 1)).round().astype(int).tolist()))
+
+
+def make(name, n, noise, sparse):
+    """
+    Network of type name with about n nodes and noise couplings, Q and V_0.
+    """
+    if name == "lattice2d":
+        side = max(int(round(n**(1/2))), 1)
+        shape = (side, side)
+    elif name == "lattice3d":
+        side = max(int(round(n**(1/3))), 1)
+        shape = (side, side, side)
+    else:
+        shape = n
+    N = int(np.prod(shape))
+    nodes = noise_nodes(N, noise)
+    if name.startswith("lattice"):
+        return generators.lattice(shape, nodes, sparse)
+    if name == "random":
+        return generators.random_sparse(N, noise=nodes, sparse=sparse, seed=0)
+    return getattr(generators, name)(N, nodes, sparse)
+
+
+NETWORKS = ["chain", "ring", "lattice2d", "lattice3d", "star", "complete", "random"]
+
+
+def stages(Q, V_0, engine):
+    """
+    The stages of one calculation as (name, function) pairs. Each function
+    takes the output of the one before; the propagation engine is split
+    into the propagation loop and the W_df step.
+    """
+    solver = dfs(Q, V_0, verbose=False)
+    N = Q.shape[0]
+    def W_df(subspaces):
+        Wdf_dim = N - len(subspaces)
+        dfs_ = solver.W_df(subspaces, Wdf_dim) if Wdf_dim != 0 else None
+        return Wdf_dim, dfs_, subspaces
+    def decouple(result):
+        Wdf_dim, W_df_, subspaces = result
+        if Wdf_dim != 0:
+            solver.decouple_system(subspaces, W_df_, N)
+        return result
+    if engine == "propagation":
+        return [("propagation", lambda _: solver.affected_subspaces()),
+                ("W_df", W_df), ("decouple_system", decouple)]
+    return [(engine, lambda _: solver.solve(engine)), ("decouple_system", decouple)]
+
+
+def run_stages(Q, V_0, engine, repeat, memory):
+    """
+    Best time (and peak traced memory) of each stage over repeat runs.
+    Memory is measured in a separate run, as tracing slows the code down.
+    """
+    times = {}
+    peaks = {}
+    for i in range(repeat):
+        value = None
+        for name, function in stages(Q, V_0, engine):
+            start = time.perf_counter()
+            value = function(value)
+            elapsed = time.perf_counter() - start
+            times[name] = min(times.get(name, elapsed), elapsed)
+    if memory:
+        value = None
+        for name, function in stages(Q, V_0, engine):
+            tracemalloc.start()
+            value = function(value)
+            peaks[name] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    return times, peaks, value[0]
+
+
+def reference(Q, V_0):
+    """
+    Wdf_dim from the Krylov rank modulo primes (see modular.py), which the
+    engines are checked against. None if Q or V_0 is not integer.
+    """
+    try:
+        return int(dfs(Q, V_0, verbose=False).modular_dimension())
+    except ValueError:
+        return None
+
+
+def version():
+    """
+    Commit (or "unknown") and library versions, stored with every result.
+    """
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = "unknown"
+    return {"commit": commit, "python": platform.python_version(), "numpy": np.__version__}
+
+
+def benchmark(networks, sizes, engines, noise=1, sparse=False, repeat=3, memory=True,
+              strict=False):
+    """
+    Yields one record (a dict) per network, size, engine and stage. A record
+    whose Wdf_dim differs from the reference (or from the first engine when
+    there is none) has "agrees" False, or raises ValueError if strict.
+    """
+    info = version()
+    for name in networks:
+        for n in sizes:
+            start = time.perf_counter()
+            Q, V_0 = make(name, n, noise, sparse)
+            build = time.perf_counter() - start
+            expected = reference(Q, V_0)
+            for engine in engines:
+                times, peaks, Wdf_dim = run_stages(Q, V_0, engine, repeat, memory)
+                if expected is None:
+                    expected = int(Wdf_dim)
+                if strict and int(Wdf_dim) != expected:
+                    raise ValueError("%s, N = %d: %s gave Wdf_dim %d, not %d"%(
+                        name, Q.shape[0], engine, Wdf_dim, expected))
+                times = {"network": build, **times}
+                for stage, seconds in times.items():
+                    yield {"network": name, "N": Q.shape[0], "noise": len(V_0),
+                           "sparse": sparse, "engine": engine, "stage": stage,
+                           "seconds": seconds, "peak_bytes": peaks.get(stage),
+                           "Wdf_dim": int(Wdf_dim), "reference_Wdf_dim": expected,
+                           "agrees": int(Wdf_dim) == expected, **info}
+
+
+def compare(old_path, new_path):
+    """
+    Prints new/old time and memory ratios for every record in both files,
+    or WRONG where either run gave the wrong Wdf_dim.
+    """
+    def load(path):
+        with open(path) as file:
+            records = [json.loads(line) for line in file if line.strip()]
+        return {(r["network"], r["N"], r["noise"], r["sparse"], r["engine"], r["stage"]): r
+                for r in records}
+    old = load(old_path)
+    new = load(new_path)
+    print("%-10s %6s %-12s %-16s %10s %10s"%("network", "N", "engine", "stage", "time", "memory"))
+    for key in sorted(set(old) & set(new)):
+        a, b = old[key], new[key]
+        if not (a.get("agrees", True) and b.get("agrees", True)):
+            print("%-10s %6d %-12s %-16s %10s"%(key[0], key[1], key[4], key[5], "WRONG"))
+            continue
+        time_ratio = b["seconds"]/a["seconds"] if a["seconds"] > 0 else float("nan")
+        if a.get("peak_bytes") and b.get("peak_bytes") is not None:
+            memory_ratio = "%10.2f"%(b["peak_bytes"]/a["peak_bytes"])
+        else:
+            memory_ratio = "%10s"%("-")
+        print("%-10s %6d %-12s %-16s %10.2f %s"%(key[0], key[1], key[4], key[5], time_ratio, memory_ratio))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark network and the dfs engines.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[16, 64, 144])
+    parser.add_argument("--engines", nargs="+", choices=sorted(ENGINES),
+                        default=["block", "exact", "spectral"])
+    parser.add_argument("--networks", nargs="+", choices=NETWORKS, default=NETWORKS)
+    parser.add_argument("--noise", type=int, default=1, help="number of noise couplings")
+    parser.add_argument("--sparse", action="store_true", help="build Q as a sparse matrix")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-memory", action="store_true", help="skip peak memory runs")
+    parser.add_argument("--strict", action="store_true",
+                        help="stop at the first engine giving a different Wdf_dim")
+    parser.add_argument("--output", help="append the results to this JSON lines file")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"),
+                        help="compare two result files instead of running")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return 0
+    output = open(args.output, "a") if args.output else None
+    print("%-10s %6s %-12s %-16s %10s %12s %6s"%("network", "N", "engine", "stage",
+                                                 "seconds", "peak bytes", "W_df"))
+    wrong = {}
+    try:
+        for record in benchmark(args.networks, args.sizes, args.engines, args.noise,
+                                args.sparse, args.repeat, not args.no_memory, args.strict):
+            peak = record["peak_bytes"]
+            print("%-10s %6d %-12s %-16s %10.4f %12s %6d%s"%(
+                record["network"], record["N"], record["engine"], record["stage"],
+                record["seconds"], "-" if peak is None else peak, record["Wdf_dim"],
+                "" if record["agrees"] else " WRONG"))
+            if not record["agrees"]:
+                wrong[(record["network"], record["N"], record["engine"])] = record
+            if output is not None:
+                output.write(json.dumps(record) + "\n")
+    finally:
+        if output is not None:
+            output.close()
+    for (name, N, engine), record in sorted(wrong.items()):
+        print("%s, N = %d: %s gave Wdf_dim %d, not %d"%(
+            name, N, engine, record["Wdf_dim"], record["reference_Wdf_dim"]), file=sys.stderr)
+    return 1 if wrong else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
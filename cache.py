@@ -0,0 +1,126 @@
+"""
+      Cache of dfs results, so that a network which has been solved before
+      is not solved again, even if its nodes have been labelled differently.
+      Recent results are kept in memory and, optionally, all of them on disk.
+"""
+
+# IMPORT MODULES ==============================================================
+import hashlib
+import os
+import pickle
+from collections import OrderedDict
+import numpy as np
+
+from dfs import dfs
+from symmetry import couplings, dense_rank, equitable_colours, neighbours, refine
+
+#==============================================================================
+
+def canonical_order(Q, V_0):
+    """
+    Orders the nodes by colour refinement of (Q, V_0), individualising the
+    lowest labelled node of the first tied colour until every node has its
+    own colour. Returns order, with order[i] the node placed i-th. Networks
+    which differ only by labelling usually get the same reordered (Q, V_0);
+    when ties are broken differently they do not, which only costs a miss.
+    """
+    N = Q.shape[0]
+    rows, cols, weights = neighbours(Q)
+    colours = equitable_colours(Q, V_0)
+    while len(np.unique(colours)) < N:
+        counts = np.bincount(colours)
+        tied = np.nonzero(counts > 1)[0][0]
+        node = np.nonzero(colours == tied)[0][0]
+        colours = 2*colours
+        colours[node] += 1
+        colours = refine(dense_rank(colours), rows, cols, weights)
+    return np.argsort(colours)
+
+
+def canonical_key(Q, V_0, engine, order):
+    """
+    sha256 of (Q, V_0) with nodes relabelled by order and noise vectors
+    sorted, together with the engine used.
+    """
+    N = Q.shape[0]
+    position = np.argsort(order) # new label of each node
+    edges, weights = couplings(Q)
+    pairs = np.sort(position[edges], axis=1)
+    sort = np.lexsort((pairs[:, 1], pairs[:, 0]))
+    V_0 = np.asarray(V_0, dtype=float).reshape(-1, N)[:, order]
+    V_0 = V_0[np.lexsort(V_0.T[::-1])] if len(V_0) > 0 else V_0
+    digest = hashlib.sha256()
+    digest.update(("%s %d %d|"%(engine, N, len(V_0))).encode())
+    digest.update(pairs[sort].astype(np.int64).tobytes())
+    digest.update(weights[sort].tobytes())
+    digest.update(np.asarray(Q.diagonal(), dtype=float).reshape(-1)[order].tobytes())
+    digest.update(V_0.tobytes())
+    return digest.hexdigest()
+
+
+class result_cache:
+    """
+    Cache in front of dfs. Keeps the maxsize most recently used results in
+    memory, and every result in directory if one is given. Results are
+    stored with their nodes in canonical order and are put back into the
+    caller's labelling when they are returned.
+    """
+    def __init__(self, maxsize=128, directory=None):
+        self.maxsize = maxsize
+        self.directory = directory
+        self.memory = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.directory, key + ".pkl")
+
+    def lookup(self, key):
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            return self.memory[key]
+        if self.directory is not None and os.path.exists(self.path(key)):
+            with open(self.path(key), "rb") as file:
+                entry = pickle.load(file)
+            self.remember(key, entry)
+            return entry
+        return None
+
+    def remember(self, key, entry):
+        self.memory[key] = entry
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.maxsize:
+            self.memory.popitem(last=False) # least recently used
+
+    def store(self, key, entry):
+        self.remember(key, entry)
+        if self.directory is not None:
+            temporary = self.path(key) + ".tmp"
+            with open(temporary, "wb") as file:
+                pickle.dump(entry, file)
+            os.replace(temporary, self.path(key)) # never leave half a file
+
+    def propagation(self, Q, V_0, engine="spectral", verbose=False):
+        """
+        Returns Wdf_dim, W_df and the subspaces affected by noise, as
+        dfs(Q, V_0).solve(engine) would, from the cache when possible.
+        """
+        order = canonical_order(Q, V_0)
+        key = canonical_key(Q, V_0, engine, order)
+        inverse = np.argsort(order)
+        entry = self.lookup(key)
+        if entry is not None:
+            self.hits += 1
+            Wdf_dim, W_df, subspaces = entry
+            if W_df is not None:
+                W_df = W_df[:, inverse]
+            return Wdf_dim, W_df, subspaces[:, inverse]
+        self.misses += 1
+        Wdf_dim, W_df, subspaces = dfs(Q, V_0, verbose).solve(engine)
+        entry = (Wdf_dim,
+                 None if W_df is None else W_df[:, order],
+                 subspaces[:, order])
+        self.store(key, entry)
+        return Wdf_dim, W_df, subspaces
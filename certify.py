@@ -0,0 +1,171 @@
+"""
+      Exact certificate for a W_df found in floating point. The float basis
+      is turned into a rational one (reduced row echelon form, rounded with
+      limit_denominator), then three things are checked exactly:
+
+        V_0 . W_df = 0                      W_df is decoherence free
+        Q W_df is inside span(W_df)         W_df is invariant under Q
+        rank [V_0, QV_0, ...] = N - dim W_df  nothing is missing
+
+      The first two are integer matrix identities, checked modulo enough
+      primes that their product is more than twice the largest possible
+      entry, which makes them exact (Chinese remainder theorem). The third
+      is a Krylov rank modulo a prime (see modular.py); it can only be too
+      low, so when it matches the certificate holds.
+
+      When span(W_df) is larger than the affected subspace, the affected
+      subspace is checked instead: V_0 inside it and invariant under Q.
+"""
+
+# IMPORT MODULES ==============================================================
+import math
+import numpy as np
+from fractions import Fraction
+
+from exact import basis, integer_matrix, reduce
+from modular import PRIMES, reduce_Q, multiply_Q, krylov_rank, matmul, mod
+
+#==============================================================================
+
+def prime_list(count, below=2**20):
+    """
+    The count largest primes below below, largest first, by trial division.
+    Used when the bound needs more primes than modular.PRIMES.
+    """
+    found = []
+    n = below - 1
+    while len(found) < count and n > 1:
+        if n % 2 == 1 and all(n % d for d in range(3, int(n**0.5) + 1, 2)):
+            found.append(n)
+        n -= 1
+    return found
+
+
+def rational_rref(rows, max_denominator=10**6):
+    """
+    Rational basis for the span of the float rows (independent), in reduced
+    row echelon form. The pivots come from a QR factorisation with column
+    pivoting, entries are rounded with limit_denominator (once per distinct
+    value) and the pivot columns are set to the identity exactly. Returns
+    an exact.basis, with one denominator per row, and the pivot columns.
+    """
+    from scipy.linalg import qr
+    rows = np.asarray(rows, dtype=float)
+    k = len(rows)
+    order = qr(rows, mode="economic", pivoting=True)[2]
+    pivots = order[:k]
+    echelon = np.linalg.solve(rows[:, pivots], rows)
+    values, where = np.unique(np.round(echelon, 12), return_inverse=True)
+    fractions = [Fraction(float(v)).limit_denominator(max_denominator) for v in values]
+    tops = np.array([f.numerator for f in fractions], dtype=object)[where].reshape(echelon.shape)
+    bottoms = np.array([f.denominator for f in fractions], dtype=object)[where].reshape(echelon.shape)
+    tops[:, pivots] = np.eye(k, dtype=int).astype(object)
+    bottoms[:, pivots] = 1
+    denominators = np.array([math.lcm(*set(row.tolist())) for row in bottoms], dtype=object)
+    numerators = tops*(denominators[:, None]//bottoms)
+    return basis(numerators, denominators), [int(p) for p in pivots]
+
+
+def complement(echelon, pivots):
+    """
+    Exact basis of every vector orthogonal to the rows of echelon (from
+    rational_rref): one vector per non-pivot column j, 1 at j and minus
+    column j of echelon at the pivots.
+    """
+    k, N = echelon.shape
+    free = np.setdiff1d(np.arange(N), pivots)
+    G = math.lcm(*echelon.denominators.tolist()) if k else 1
+    scale = np.array([G//d for d in echelon.denominators], dtype=object)
+    numerators = np.zeros((len(free), N), dtype=object)
+    numerators[np.arange(len(free)), free] = G
+    if k:
+        numerators[:, pivots] = -np.transpose(echelon.numerators[:, free]*scale[:, None])
+    rows = [reduce(row, G) for row in numerators]
+    return basis(np.array([r[0] for r in rows], dtype=object).reshape(len(free), N),
+                 np.array([r[1] for r in rows], dtype=object))
+
+
+def residues(x, p):
+    """
+    Python ints (object array) modulo p, as float64 for modular.matmul.
+    """
+    return np.mod(np.asarray(x, dtype=object), p).astype(float)
+
+
+def biggest(x):
+    """
+    Largest absolute value in an array of Python ints.
+    """
+    return max((abs(int(v)) for v in np.asarray(x, dtype=object).ravel()), default=0)
+
+
+def check(Q, V_0, echelon, pivots, affected):
+    """
+    Exactly checks that span(echelon) is invariant under Q and that it is
+    orthogonal to V_0 (affected=False) or contains it (affected=True).
+    """
+    k, N = echelon.shape
+    n = echelon.numerators
+    G = math.lcm(*echelon.denominators.tolist())
+    M = np.array([G//d for d in echelon.denominators], dtype=object)
+    # with Y = n Q, invariance is G Y = (Y[:, pivots] M) n
+    row_sum = int(np.max(abs(Q).sum(axis=1))) if N else 0
+    Y_bound = biggest(n)*row_sum
+    bound = G*Y_bound + k*Y_bound*biggest(M)*biggest(n)
+    V_bound = int(np.max(abs(V_0).sum(axis=1), initial=0))
+    if affected: # G V_0 = (V_0[:, pivots] M) n
+        bound = max(bound, G*V_bound + k*V_bound*biggest(M)*biggest(n))
+    else: # V_0 n^T = 0
+        bound = max(bound, V_bound*biggest(n))
+    primes = list(PRIMES)
+    while math.prod(primes) <= 2*bound:
+        primes = prime_list(2*len(primes))
+    V = np.asarray(V_0, dtype=object)
+    used = 1
+    for p in primes:
+        if used > 2*bound: # the checks so far hold over the integers
+            break
+        used *= p
+        n_p = residues(n, p)
+        M_p = residues(M, p)
+        Y_p = multiply_Q(reduce_Q(Q, p), n_p, p)
+        right = matmul(mod(Y_p[:, pivots]*M_p[None, :], p), n_p, p)
+        if np.any(mod(G % p*Y_p - right, p) != 0):
+            return False
+        V_p = residues(V, p)
+        if affected:
+            right = matmul(mod(V_p[:, pivots]*M_p[None, :], p), n_p, p)
+            if np.any(mod(G % p*V_p - right, p) != 0):
+                return False
+        elif np.any(matmul(V_p, np.transpose(n_p), p) != 0):
+            return False
+    return True
+
+
+def certified(Q, V_0, W_df, subspaces, max_denominator=10**6, primes=2):
+    """
+    Certifies the float result of an engine. Returns Wdf_dim, W_df and the
+    subspaces affected by noise as exact bases (echelon form, not
+    orthogonal), or None if the certificate fails.
+    """
+    Q = integer_matrix(Q)
+    if hasattr(V_0, "toarray"):
+        V_0 = V_0.toarray()
+    N = Q.shape[0]
+    V_0 = integer_matrix(V_0).reshape(-1, N)
+    Wdf_dim = 0 if W_df is None else len(W_df)
+    rank = N - Wdf_dim
+    if max(krylov_rank(Q, V_0, p) for p in PRIMES[:primes]) != rank:
+        return None
+    if Wdf_dim == 0 or rank == 0:
+        identity = basis(np.eye(N, dtype=int).astype(object), np.ones(N, dtype=object))
+        empty = basis(np.zeros((0, N), dtype=object), np.zeros(0, dtype=object))
+        return (0, None, identity) if Wdf_dim == 0 else (N, identity, empty)
+    affected = rank < Wdf_dim # check the smaller of the two
+    echelon, pivots = rational_rref(subspaces if affected else W_df, max_denominator)
+    if not check(Q, V_0, echelon, pivots, affected):
+        return None
+    other = complement(echelon, pivots)
+    if affected:
+        return Wdf_dim, other, echelon
+    return Wdf_dim, echelon, other
@@ -0,0 +1,121 @@
+"""
+      Splits a network into its connected components before looking for a
+      decoherence free subspace. A component with no noise coupled to it is
+      decoherence free as a whole, and every other component is solved on
+      its own, in parallel, before the results are put back together.
+"""
+
+# IMPORT MODULES ==============================================================
+import numpy as np
+
+from dfs import dfs
+from network_to_matrix import connected_components
+
+#==============================================================================
+
+def edge_list(Q):
+    """
+    Pairs (i, j), i < j, of coupled nodes in a dense or sparse Q.
+    """
+    if hasattr(Q, "tocoo"):
+        Q = Q.tocoo()
+        (rows, cols) = (Q.row, Q.col)
+        keep = (rows < cols) & (Q.data != 0)
+    else:
+        (rows, cols) = np.nonzero(Q)
+        keep = rows < cols
+    return np.column_stack([rows[keep], cols[keep]])
+
+
+def split(Q, V_0):
+    """
+    Returns a list of (nodes, noise) for each connected component, where
+    nodes are the labels of its oscillators and noise the rows of V_0
+    acting on it (empty when it is decoherence free as a whole). Nodes
+    touched by the same noise vector count as one component.
+    """
+    V_0 = np.asarray(V_0, dtype=float).reshape(-1, Q.shape[0])
+    supports = [np.nonzero(row)[0] for row in V_0]
+    labels = connected_components(edge_list(Q), Q.shape[0], supports)
+    noise_of = [[] for i in range(labels.max(initial=-1) + 1)]
+    for i, support in enumerate(supports):
+        if len(support) > 0:
+            noise_of[labels[support[0]]].append(i)
+    order = np.argsort(labels, kind="stable")
+    starts = np.searchsorted(labels[order], np.arange(len(noise_of) + 1))
+    return [(order[starts[c]:starts[c+1]], noise_of[c]) for c in range(len(noise_of))]
+
+
+def embed(vectors, nodes, N):
+    """
+    Puts vectors found on a component back into the full network.
+    """
+    if hasattr(vectors, "numerators"): # exact basis
+        from exact import basis
+        numerators = np.zeros((len(vectors), N), dtype=object)
+        numerators[:, nodes] = vectors.numerators
+        return basis(numerators, vectors.denominators.copy())
+    vectors = np.asarray(vectors, dtype=float)
+    full = np.zeros((len(vectors), N))
+    full[:, nodes] = vectors
+    return full
+
+
+def stack(parts, N):
+    """
+    vstack for a list of embedded vectors which may be exact bases.
+    """
+    parts = [part for part in parts if len(part) > 0]
+    if len(parts) == 0:
+        return np.zeros((0, N))
+    if all(hasattr(part, "numerators") for part in parts):
+        from exact import basis
+        return basis(np.vstack([part.numerators for part in parts]),
+                     np.concatenate([part.denominators for part in parts]))
+    return np.vstack([np.asarray(part, dtype=float) for part in parts])
+
+
+def solve_by_components(Q, V_0, engine="spectral", processes=None):
+    """
+    Returns Wdf_dim, W_df and the subspaces affected by noise, like
+    dfs.solve, for the whole network. Components without noise give their
+    unit vectors straight to W_df. The rest are solved with engine, on a
+    process pool when there is more than one of them and processes is not 1.
+    """
+    N = Q.shape[0]
+    V_0 = np.asarray(V_0, dtype=float).reshape(-1, N)
+    if hasattr(Q, "tocsr"):
+        Q = Q.tocsr()
+    free = []
+    tasks = []
+    task_nodes = []
+    for nodes, noise in split(Q, V_0):
+        if len(noise) == 0:
+            free.append(nodes)
+        else:
+            tasks.append((Q[nodes][:, nodes], V_0[noise][:, nodes]))
+            task_nodes.append(nodes)
+
+    if len(tasks) > 1 and processes != 1:
+        from batch import run_batch
+        results = run_batch(tasks, engine=engine, processes=processes)
+    else:
+        results = ((i, *dfs(Qc, Vc, verbose=False).solve(engine))
+                   for i, (Qc, Vc) in enumerate(tasks))
+
+    W_dfs = []
+    affected = []
+    for i, Wdf_dim, W_df, subspaces in results:
+        affected.append(embed(subspaces, task_nodes[i], N))
+        if Wdf_dim != 0:
+            W_dfs.append(embed(W_df, task_nodes[i], N))
+    if len(free) > 0:
+        nodes = np.concatenate(free)
+        unit = np.zeros((len(nodes), N))
+        unit[np.arange(len(nodes)), nodes] = 1.0
+        W_dfs.append(unit)
+
+    subspaces = stack(affected, N)
+    Wdf_dim = N - len(subspaces)
+    W_df = stack(W_dfs, N) if Wdf_dim != 0 else None
+    return Wdf_dim, W_df, subspaces
@@ -3,41 +3,362 @@
                           and find what it is.
 """
 # IMPORT MODULES ==============================================================
+import time
 import numpy as np
 from fractions import Fraction
-import sympy as sp
+# sympy is only imported by the methods which need it, as it is slow to load
+
+# names accepted by dfs.solve and the command line, mapped to dfs methods
+ENGINES = {
+    "propagation": "propagation",
+    "block": "block_propagation",
+    "exact": "exact_propagation",
+    "spectral": "spectral_propagation",
+    "symmetric": "symmetric_propagation",
+    "certified": "certified_propagation",
+}
+
+
+def eigenspace_split(values, vectors, V_0, tol=1e-8):
+    """
+    Splits the eigenvectors (columns of vectors) of a symmetric matrix, with
+    values in increasing order, into the subspaces affected by noise and 
+    W_df. Within each eigenspace (eigenvalues closer than tol) the part 
+    reached by V_0 is affected by noise and the part orthogonal to V_0 is 
+    decoherence free. Returns both as orthonormal rows.
+    """
+    n = len(values)
+    scale = max(np.max(np.abs(values), initial=0), 1.0)
+    splits = np.nonzero(np.diff(values) > tol*scale)[0] + 1
+    affected = [np.zeros((0, vectors.shape[0]))]
+    free = [np.zeros((0, vectors.shape[0]))]
+    for cluster in np.split(np.arange(n), splits) if n else []:
+        U = vectors[:, cluster] # columns span one eigenspace
+        U_, s, Vt = np.linalg.svd(V_0 @ U, full_matrices=True)
+        rank = int(np.sum(s > tol))
+        affected.append(Vt[:rank] @ U.T)
+        free.append(Vt[rank:] @ U.T)
+    return np.vstack(affected), np.vstack(free)
 
 # =============================================================================
 class dfs:
-    def __init__(self, Q, V_0):
-        self.Q = Q
+    def __init__(self, Q, V_0, verbose=True, hooks=None):
+        self.Q = Q # dense array or scipy.sparse matrix
         self.V_0 = V_0
+        self.verbose = verbose # False stops all printing to the console
+        self.hooks = list(hooks) if hooks is not None else [] # see add_hook
+     
+    def add_hook(self, hook):
+        """
+        Registers hook(event, data) to be called as the calculation runs, 
+        where data is a dict. The events are:
+          "start"          engine, N
+          "iteration"      iteration, krylov_dim, seconds (one Krylov sweep)
+          "orthogonalize"  seconds (one Gram-Schmidt of a vector or block)
+          "rank"           accepted, krylov_dim (new vector kept or not)
+          "rref"           seconds (Gaussian elimination in W_df)
+          "W_df"           seconds (all of W_df, including the rref)
+          "decouple"       seconds
+          "certificate"    passed, seconds (exact check of a float result)
+          "result"         Wdf_dim
+        With no hooks nothing is timed, so there is no cost when unused.
+        """
+        self.hooks.append(hook)
+
+    def emit(self, event, **data):
+        for hook in self.hooks:
+            hook(event, data)
      
+    def solve(self, engine="propagation"):
+        """
+        Runs the named engine (see ENGINES), returning Wdf_dim, W_df and the
+        subspaces affected by noise.
+        """
+        if engine not in ENGINES:
+            raise ValueError("unknown engine %r, choose from %s"%(engine, ", ".join(ENGINES)))
+        if self.hooks:
+            self.emit("start", engine=engine, N=self.Q.shape[0])
+        return getattr(self, ENGINES[engine])()
         
     def propagation(self):
-       subspaces = self.V_0
-       W_ks = self.V_0
+       subspaces = self.affected_subspaces()
+       self.print_subspaces(subspaces, False)
+       dim_space, dim_vec = subspaces.shape # num of subspaces affected by noise, num of nodes
+       Wdf_dim = int(dim_vec - dim_space) #dimension of W_df
+       self.report(Wdf_dim)
+       if Wdf_dim == 0: 
+            dfs = None
+       elif Wdf_dim != 0:          
+            dfs = self.W_df(subspaces, Wdf_dim) # determine decoherence free subspaces
+            if self.verbose:
+                self.decouple_system(subspaces, dfs, dim_vec)
+       return Wdf_dim, dfs, subspaces
+
+    def affected_subspaces(self):
+       """
+       The propagation loop: repeatedly multiplies by Q and Gram-Schmidts
+       until nothing new is found, returning the subspaces affected by noise.
+       """
+       W_ks = np.array(self.V_0, dtype=float) # copy, so V_0 is not overwritten
+       buffer = np.array(W_ks, dtype=object) # subspaces, grown by doubling
+       size = len(buffer)
+       hooks = bool(self.hooks)
+       iteration = 0
 
        while np.all(W_ks == 0) == False: 
+           if hooks:
+               sweep_start = time.perf_counter()
            for i in range(len(W_ks)):  
                W_k = W_ks[i]
                W_new = self.multiply(self.Q, W_k)
-               W_new = self.Gram_Schmidt(W_new, subspaces)
+               if hooks:
+                   start = time.perf_counter()
+               W_new = self.Gram_Schmidt(W_new, buffer[:size])
+               if hooks:
+                   self.emit("orthogonalize", seconds=time.perf_counter() - start)
                W_simp = np.vectorize(lambda x: Fraction(x).limit_denominator())(W_new) 
-               if np.all(W_simp == 0) == False: 
-                   subspaces = np.vstack([subspaces, W_simp])
+               accepted = np.all(W_simp == 0) == False
+               if accepted: 
+                   buffer = self.grow(buffer, size + 1)
+                   buffer[size] = W_simp
+                   size += 1
+               if hooks:
+                   self.emit("rank", accepted=bool(accepted), krylov_dim=size)
                W_ks[i] = W_simp
-       self.print_subspaces(subspaces, False)
-       dim_space, dim_vec = subspaces.shape # num of subspaces affected by noise, num of nodes
-       Wdf_dim = int(dim_vec - dim_space) #dimension of W_df
-       if Wdf_dim == 0: 
-            print("There is no decoherence free subspace.")
+           iteration += 1
+           if hooks:
+               self.emit("iteration", iteration=iteration, krylov_dim=size,
+                         seconds=time.perf_counter() - sweep_start)
+       return buffer[:size]
+
+    def block_propagation(self, tol=1e-10):
+        """
+        Propagates the whole block Q W_k at once. Each new block is 
+        orthogonalised against every subspace found so far with two passes 
+        of block Gram-Schmidt and its rank is read off its singular values, 
+        so a sweep costs a few matrix products instead of a Python loop.
+        Rounding can let in directions V_0 never reaches, so the span found
+        is then cut down to the part V_0 reaches (see reached).
+        """
+        W_ks = self.orthonormal_block(np.array(self.V_0, dtype=float), None, tol)
+        buffer = W_ks.copy() # subspaces, grown by doubling
+        size = len(W_ks)
+        hooks = bool(self.hooks)
+        iteration = 0
+        while len(W_ks) > 0:
+            if hooks:
+                sweep_start = time.perf_counter()
+            W_new = np.transpose(self.multiply(self.Q, np.transpose(W_ks)))
+            if hooks:
+                start = time.perf_counter()
+            W_ks = self.orthonormal_block(W_new, buffer[:size], tol)
+            buffer = self.grow(buffer, size + len(W_ks))
+            buffer[size:size + len(W_ks)] = W_ks
+            size += len(W_ks)
+            iteration += 1
+            if hooks:
+                now = time.perf_counter()
+                self.emit("orthogonalize", seconds=now - start)
+                self.emit("rank", accepted=len(W_ks) > 0, krylov_dim=size)
+                self.emit("iteration", iteration=iteration, krylov_dim=size,
+                          seconds=now - sweep_start)
+        subspaces = self.reached(buffer[:size])
+        self.print_subspaces(subspaces, False)
+        dim_space, dim_vec = subspaces.shape
+        Wdf_dim = int(dim_vec - dim_space)
+        self.report(Wdf_dim)
+        if Wdf_dim == 0:
             dfs = None
-       elif Wdf_dim != 0:          
+        else:
+            dfs = self.complement(subspaces)
+            self.print_subspaces(dfs, True)
+            if self.verbose:
+                self.decouple_system(subspaces, dfs, dim_vec)
+        return Wdf_dim, dfs, subspaces
+
+    def lanczos_dimension(self, stream=None):
+        """
+        Returns only the dimension of W_df, from a block Lanczos recurrence
+        which keeps just the last two blocks (see exact.lanczos_dimension),
+        so memory does not grow with the noise affected subspace. If stream 
+        is a file name, the blocks are written there as float64 rows.
+        """
+        from exact import lanczos_dimension
+        if stream is None:
+            Wdf_dim = lanczos_dimension(self.Q, self.V_0)
+        else:
+            with open(stream, "wb") as file:
+                Wdf_dim = lanczos_dimension(self.Q, self.V_0, file)
+        self.report(Wdf_dim)
+        return Wdf_dim
+
+    def modular_dimension(self, primes=2):
+        """
+        Returns only the dimension of W_df, from the rank of the Krylov space
+        modulo a few primes (see modular.py). Q and V_0 must be integer. Much
+        faster than any engine when the bases are not needed.
+        """
+        from modular import modular_dimension
+        Wdf_dim = modular_dimension(self.Q, self.V_0, primes)
+        self.report(Wdf_dim)
+        return Wdf_dim
+
+    def grow(self, buffer, size):
+        """
+        Returns buffer, doubled in length as often as needed to hold size
+        rows, so adding a row does not copy all of the rows every time.
+        """
+        if size <= len(buffer):
+            return buffer
+        rows = max(len(buffer), 1)
+        while rows < size:
+            rows *= 2
+        bigger = np.zeros((rows,) + buffer.shape[1:], dtype=buffer.dtype)
+        bigger[:len(buffer)] = buffer
+        return bigger
+
+    def orthonormal_block(self, block, subspaces, tol):
+        """
+        Block classical Gram-Schmidt with reorthogonalisation. Returns an 
+        orthonormal set of rows spanning the part of block which is not 
+        already in subspaces, with numerically dependent rows dropped.
+        """
+        if len(block) == 0:
+            return block
+        scale = max(np.max(np.linalg.norm(block, axis=1)), 1.0)
+        if subspaces is not None and len(subspaces) > 0:
+            for sweep in range(2): # second pass restores orthogonality
+                block = block - (block @ subspaces.T) @ subspaces
+        U, s, Vt = np.linalg.svd(block, full_matrices=False)
+        rank = int(np.sum(s > tol*scale))
+        return Vt[:rank]
+
+    def reached(self, K, tol=1e-8):
+        """
+        The part of span(K) reached from V_0, as orthonormal rows. K is the 
+        invariant span found by propagation, which contains every subspace
+        affected by noise, but a rounding error inside W_df grows with each
+        power of Q until it is taken for a new direction. Q restricted to K
+        is split into eigenspaces as in spectral_propagation, which only 
+        keeps what V_0 reaches and costs O(len(K)^3). Q must be symmetric.
+        """
+        if len(K) == 0:
+            return K
+        T = K @ self.multiply(self.Q, np.transpose(K))
+        values, vectors = np.linalg.eigh((T + np.transpose(T))/2)
+        V_0 = np.array(self.V_0, dtype=float).reshape(-1, K.shape[1])
+        affected, free = eigenspace_split(values, vectors, V_0 @ np.transpose(K), tol)
+        return affected @ K
+
+    def complement(self, subspaces):
+        """
+        Orthonormal basis for the vectors orthogonal to every subspace, 
+        which is the decoherence free subspace found by block_propagation.
+        """
+        dim_space, dim_vec = subspaces.shape
+        U, s, Vt = np.linalg.svd(subspaces, full_matrices=True)
+        return Vt[dim_space:]
+
+    def exact_propagation(self):
+        """
+        Same algorithm as propagation, but done exactly on integer numerators
+        with a shared denominator per vector (see exact.py), so there is no 
+        rounding and no sympy in the loop. Q and V_0 must be integer.
+        """
+        from exact import exact_propagation
+        Wdf_dim, dfs, subspaces = exact_propagation(self.Q, self.V_0,
+                                                    self.emit if self.hooks else None)
+        self.print_subspaces(subspaces, False)
+        self.report(Wdf_dim)
+        if Wdf_dim != 0:
+            self.print_subspaces(dfs, True)
+            if self.verbose:
+                self.decouple_system(subspaces, dfs, subspaces.shape[1])
+        return Wdf_dim, dfs, subspaces
+
+    def spectral_propagation(self, tol=1e-8):
+        """
+        Reads the subspaces straight from the eigenvectors of the symmetric Q.
+        Within each eigenspace, the part reached by V_0 is affected by noise 
+        and the part orthogonal to V_0 is decoherence free, so a single 
+        O(N^3) eigendecomposition replaces the propagation loop. Eigenvalues
+        closer than tol are treated as one degenerate eigenspace.
+        """
+        Q = self.Q.toarray() if hasattr(self.Q, "toarray") else np.asarray(self.Q, dtype=float)
+        V_0 = np.array(self.V_0, dtype=float).reshape(-1, Q.shape[0])
+        values, vectors = np.linalg.eigh(Q)
+        subspaces, free = eigenspace_split(values, vectors, V_0, tol)
+        dim_space, dim_vec = subspaces.shape
+        Wdf_dim = int(dim_vec - dim_space)
+        self.print_subspaces(subspaces, False)
+        self.report(Wdf_dim)
+        if Wdf_dim == 0:
+            dfs = None
+        else:
+            dfs = free
+            self.print_subspaces(dfs, True)
+            if self.verbose:
+                self.decouple_system(subspaces, dfs, dim_vec)
+        return Wdf_dim, dfs, subspaces
+
+    def symmetric_propagation(self, engine="spectral"):
+        """
+        Runs engine on the quotient of the network by its coarsest equitable
+        partition which keeps V_0 (see symmetry.py) and lifts the result 
+        back, which is much smaller for symmetric networks such as rings, 
+        lattices and stars.
+        """
+        from symmetry import symmetric_propagation
+        Wdf_dim, dfs, subspaces = symmetric_propagation(self.Q, self.V_0, engine,
+                                                        self.hooks or None)
+        self.print_subspaces(subspaces, False)
+        self.report(Wdf_dim)
+        if Wdf_dim != 0:
+            self.print_subspaces(dfs, True)
+            if self.verbose:
+                self.decouple_system(subspaces, dfs, subspaces.shape[1])
+        return Wdf_dim, dfs, subspaces
+
+    def certified_propagation(self, max_denominator=10**6):
+        """
+        Runs spectral_propagation and checks its result exactly (see 
+        certify.py), returning exact bases like exact_propagation. If the
+        check fails, because of rounding or a basis with denominators above
+        max_denominator, exact_propagation is run instead. Q and V_0 must 
+        be integer.
+        """
+        from certify import certified
+        float_run = type(self)(self.Q, self.V_0, verbose=False)
+        Wdf_dim, dfs, subspaces = float_run.spectral_propagation()
+        if self.hooks:
+            start = time.perf_counter()
+        result = certified(self.Q, self.V_0, dfs, subspaces, max_denominator)
+        if self.hooks:
+            self.emit("certificate", passed=result is not None,
+                      seconds=time.perf_counter() - start)
+        if result is None:
+            return self.exact_propagation()
+        Wdf_dim, dfs, subspaces = result
+        self.print_subspaces(subspaces, False)
+        self.report(Wdf_dim)
+        if Wdf_dim != 0:
+            self.print_subspaces(dfs, True)
+            if self.verbose:
+                self.decouple_system(subspaces, dfs, subspaces.shape[1])
+        return Wdf_dim, dfs, subspaces
+
+    def report(self, Wdf_dim):
+        """
+        Prints whether a decoherence free subspace was found.
+        """
+        if self.hooks:
+            self.emit("result", Wdf_dim=Wdf_dim)
+        if self.verbose == False:
+            return
+        if Wdf_dim == 0:
+            print("There is no decoherence free subspace.")
+        else:
             print("There is a decoherence free subspace of dimension %d."%(Wdf_dim))
-            dfs = self.W_df(subspaces, Wdf_dim) # determine decoherence free subspaces
-            self.decouple_system(subspaces, dfs, dim_vec)
-       return Wdf_dim, dfs, subspaces
 
     def dot(self, vector_1, vector_2):
         """
@@ -50,8 +371,9 @@ class dfs:
         """
         MATRIX MULTIPLIED WITH VECTOR
         """
-        # Multiply matrix and vector and return result
-        result = np.matmul(matrix,vector)
+        # Multiply matrix and vector and return result, the @ operator lets
+        # a sparse Q do this in O(nnz) rather than O(N^2)
+        result = matrix @ vector
         return result
 
     def Gram_Schmidt(self, vector, subspaces):
@@ -73,9 +395,11 @@ class dfs:
         """
         returns unit vectors
         """
+        import sympy as sp
         mag_sqrd = self.dot(vector,vector)
         mag = sp.sqrt(mag_sqrd)
-        print(mag)
+        if self.verbose:
+            print(mag)
         vector = vector/mag
         return vector
 
@@ -84,10 +408,15 @@ class dfs:
         Takes subspaces formed and returns the Decoherence Free Subspace, 
         using Gaussian elimination, then Gram-Schmidt.
         """
+        import sympy as sp
+        if self.hooks:
+            start = time.perf_counter()
         subspace_cols = sp.Matrix((subspaces))
         subspaces_dim, system_dim = subspaces.shape
         
         RREF, nodes = sp.Matrix(subspace_cols).rref()
+        if self.hooks:
+            self.emit("rref", seconds=time.perf_counter() - start)
         W_df = np.zeros((Wdf_dim, system_dim),float)
         df_nodes = []
         for i in range(system_dim):
@@ -100,35 +429,101 @@ class dfs:
             vector = np.array(W_df[i])
             W_df[i] = self.Gram_Schmidt(vector, subspaces)
             subspaces = np.vstack([subspaces,W_df[i]])
+        if self.hooks:
+            self.emit("W_df", seconds=time.perf_counter() - start)
         self.print_subspaces(W_df, True)
         return W_df # returns DFS
 
     
-        #NEED TO WORK ON THIS SO THAT IT WOKRS BETTER SO WILL LEAVE IT FOR NOW
-    def decouple_system(self, subspaces, W_df, N):
-        all_subspaces_frac = np.vstack([subspaces,W_df])
-        all_subspaces = all_subspaces_frac.astype(float)
-        A_t = np.zeros((N,N)) # rows are subspaces
-        for i in range(N):  
-            A_t[i] = self.unit(all_subspaces[i])
-        A = np.transpose(A_t) # columns are subspaces
-        Q_transformed = self.multiply(A_t,(self.multiply(self.Q, A)))
-        self.print_subspaces(Q_transformed, True)
-        Roots = Q_transformed **2
-        print("Terms are all squared because can't do surds")
-        self.print_subspaces(Roots, True)
-        
+    def decouple_system(self, subspaces, W_df, N, sparse=False, exact=False, tol=1e-12):
+        """
+        Writes Q in the basis of the subspaces followed by W_df. As W_df is 
+        Q-invariant and orthogonal to the subspaces, the transformed Q is 
+        block diagonal, so only its two blocks are formed: Q on the subspaces
+        affected by noise and Q on the decoherence free subspace. Orthonormal
+        bases come from reduced QR factorisations, and Q is applied to N x k 
+        blocks, so a sparse Q is never made dense. sparse=True returns the 
+        blocks in CSR form with entries below tol dropped. exact=True instead
+        returns sympy matrices with exact surds (see exact_blocks), which is 
+        slow and only done on request.
+        """
+        if self.hooks:
+            start = time.perf_counter()
+        if exact:
+            blocks = self.exact_blocks(subspaces, W_df)
+        else:
+            blocks = []
+            for basis in (subspaces, W_df):
+                rows = np.asarray(basis, dtype=float).reshape(-1, N)
+                A, R = np.linalg.qr(np.transpose(rows)) # columns orthonormal
+                block = np.transpose(A) @ self.multiply(self.Q, A)
+                block = (block + np.transpose(block))/2 # Q is symmetric
+                if sparse:
+                    from scipy import sparse as sp
+                    scale = max(np.max(np.abs(block), initial=0.0), 1.0)
+                    block[np.abs(block) < tol*scale] = 0
+                    block = sp.csr_matrix(block)
+                blocks.append(block)
+        if self.verbose:
+            for block, name in zip(blocks, ("the subspaces affected by decoherence",
+                                            "the decoherence free subspace")):
+                print("Q on %s:"%(name))
+                print(block.toarray() if hasattr(block, "toarray") else block)
+        if self.hooks:
+            self.emit("decouple", seconds=time.perf_counter() - start)
+        return blocks[0], blocks[1]
+
+    def exact_blocks(self, subspaces, W_df):
+        """
+        The two blocks of decouple_system as sympy matrices. Each basis is 
+        made exactly orthogonal with fractions, then entry (i, j) of a block
+        is (u_i.Q.u_j)/sqrt(|u_i|^2 |u_j|^2), so the only surds are square 
+        roots of rationals. Float bases are converted with limit_denominator.
+        """
+        import sympy as sp
+        Q = self.Q.toarray() if hasattr(self.Q, "toarray") else np.asarray(self.Q)
+        Q = np.vectorize(lambda x: Fraction(x).limit_denominator())(Q).astype(object)
+        blocks = []
+        for basis in (subspaces, W_df):
+            if hasattr(basis, "fractions"):
+                rows = basis.fractions()
+            else:
+                rows = np.vectorize(lambda x: Fraction(x).limit_denominator())(
+                    np.asarray(basis, dtype=float)).astype(object)
+            orthogonal = []
+            for row in rows:
+                for u in orthogonal:
+                    row = row - (np.dot(row, u)/np.dot(u, u))*u
+                orthogonal.append(row)
+            U = np.array(orthogonal, dtype=object).reshape(len(rows), -1)
+            G = U @ Q @ np.transpose(U)
+            norms = [np.dot(u, u) for u in U]
+            blocks.append(sp.Matrix(len(U), len(U), lambda i, j: 
+                sp.Rational(G[i, j].numerator, G[i, j].denominator)
+                /sp.sqrt(sp.Rational((norms[i]*norms[j]).numerator,
+                                     (norms[i]*norms[j]).denominator))))
+        return blocks
+
     def print_subspaces(self, Matrix, Dec_Free): # needs to be changed / or not? adjust or new function to print to canvas, later
        """
        Takes the matrix containing subspaces, converts all the decimals to fractions
        and prints the matrix in a viewer friendly way such that the columns are the subspaces. 
        """
-       Printable = np.vectorize(lambda x: Fraction(x).limit_denominator())(Matrix)
+       if self.verbose == False:
+           return
+       if hasattr(Matrix, "fractions"): # exact basis, no need to guess
+           Printable = Matrix.fractions()
+       else:
+           Printable = np.vectorize(lambda x: Fraction(x).limit_denominator(),
+                                    otypes=[object])(np.asarray(Matrix, dtype=float))
        matrix = np.transpose(Printable)
        if Dec_Free == True:
            print("This is the Decoherence Free Subspace:")
        else: 
            print("These are the subspaces affected by decoherence:")
+       if Printable.size == 0:
+           print("(none)")
+           return
       
         # Determine the width of each column
        column_widths = [max(len(str(item)) for item in matrix[:, col]) for col in range(matrix.shape[1])]
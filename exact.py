@@ -0,0 +1,292 @@
+"""
+      Exact arithmetic for the subspace computation. Every vector is kept as
+      an integer numerator array and a single shared denominator, so no
+      Fraction objects or sympy matrices are needed while propagating.
+"""
+
+# IMPORT MODULES ==============================================================
+import math
+import time
+import numpy as np
+from fractions import Fraction
+
+#==============================================================================
+
+class basis:
+    """
+    Set of exact rational vectors, row i is numerators[i]/denominators[i].
+    """
+    def __init__(self, numerators, denominators):
+        self.numerators = numerators # 2D object array of python ints
+        self.denominators = denominators # 1D object array of python ints
+
+    @property
+    def shape(self):
+        return self.numerators.shape
+
+    def __len__(self):
+        return len(self.numerators)
+
+    def __array__(self, dtype=None, copy=None):
+        rows, cols = self.shape
+        values = np.zeros((rows, cols))
+        for i in range(rows):
+            d = self.denominators[i]
+            values[i] = [n/d for n in self.numerators[i]] # rounded once, to the nearest float
+        if dtype is not None:
+            values = values.astype(dtype)
+        return values
+
+    def __getitem__(self, key):
+        """
+        Row and column selection, returning another basis.
+        """
+        if isinstance(key, tuple):
+            rows, cols = key
+        else:
+            rows, cols = key, slice(None)
+        numerators = self.numerators[rows]
+        denominators = np.atleast_1d(self.denominators[rows])
+        if numerators.ndim == 1:
+            numerators = numerators.reshape(1, -1)
+        return basis(numerators[:, cols], denominators)
+
+    def fractions(self):
+        """
+        Returns the vectors as an array of Fractions, for printing only.
+        """
+        rows, cols = self.shape
+        values = np.empty((rows, cols), dtype=object)
+        for i in range(rows):
+            d = self.denominators[i]
+            values[i] = [Fraction(n, d) for n in self.numerators[i]]
+        return values
+
+
+def integer_matrix(matrix):
+    """
+    Converts Q or V_0 (dense or sparse) into integers, so they can be used
+    exactly. Raises ValueError if an entry is not a whole number.
+    """
+    if hasattr(matrix, "tocsr"):
+        matrix = matrix.tocsr()
+        values = matrix.data
+    else:
+        matrix = np.asarray(matrix)
+        values = matrix
+    if np.any(values != np.round(values)):
+        raise ValueError("the exact engine needs integer Q and V_0")
+    return matrix.astype(np.int64)
+
+
+def reduce(numerator, denominator):
+    """
+    Divides out the common factor of a vector and its denominator.
+    """
+    g = math.gcd(*numerator.tolist(), denominator)
+    if denominator < 0:
+        g = -g
+    if g not in (0, 1):
+        numerator = numerator // g
+        denominator = denominator // g
+    return numerator, denominator
+
+
+def multiply(Q, numerator, row_bound):
+    """
+    Q times an integer vector. Uses int64 when the result cannot overflow
+    and falls back to python ints otherwise.
+    """
+    biggest = max((abs(n) for n in numerator), default=0)
+    if biggest*row_bound < 2**62:
+        result = Q @ numerator.astype(np.int64)
+        return np.asarray(result).astype(object)
+    if hasattr(Q, "tocoo"):
+        Q = Q.tocoo()
+        result = np.zeros(Q.shape[0], dtype=object)
+        np.add.at(result, Q.row, Q.data.astype(object)*numerator[Q.col])
+        return result
+    return Q.astype(object) @ numerator
+
+
+class orthogonal_set:
+    """
+    Mutually orthogonal exact vectors, stored as numerator rows in a
+    buffer which doubles in size when full.
+    """
+    def __init__(self, system_dim):
+        self.numerators = np.zeros((4, system_dim), dtype=object)
+        self.denominators = np.zeros(4, dtype=object)
+        self.norms = np.zeros(4, dtype=object) # numerator . numerator
+        self.size = 0
+
+    def project_out(self, numerator, denominator):
+        """
+        Exact Gram-Schmidt against all vectors in the set at once, valid
+        because the set is orthogonal. Returns the reduced remainder.
+        """
+        if self.size == 0:
+            return reduce(numerator, denominator)
+        S = self.numerators[:self.size]
+        norms = self.norms[:self.size]
+        dots = S @ numerator
+        hit = np.nonzero(dots)[0]
+        if len(hit) == 0:
+            return reduce(numerator, denominator)
+        L = math.lcm(*norms[hit].tolist())
+        coefficients = dots[hit]*np.array([L//n for n in norms[hit]], dtype=object)
+        numerator = L*numerator - coefficients @ S[hit]
+        return reduce(numerator, denominator*L)
+
+    def append(self, numerator, denominator, norm=None):
+        if self.size == len(self.numerators):
+            self.numerators = np.vstack([self.numerators, np.zeros_like(self.numerators)])
+            self.denominators = np.concatenate([self.denominators, np.zeros_like(self.denominators)])
+            self.norms = np.concatenate([self.norms, np.zeros_like(self.norms)])
+        self.numerators[self.size] = numerator
+        self.denominators[self.size] = denominator
+        self.norms[self.size] = numerator @ numerator if norm is None else norm
+        self.size += 1
+
+    def extend(self, other, start=0):
+        """
+        Appends the vectors of another orthogonal_set from start onwards.
+        """
+        for i in range(start, other.size):
+            self.append(other.numerators[i], other.denominators[i], other.norms[i])
+
+    def to_basis(self, start=0):
+        return basis(self.numerators[start:self.size].copy(),
+                     self.denominators[start:self.size].copy())
+
+
+def pivot_columns(numerators):
+    """
+    Fraction-free Gaussian elimination on integer rows, returning the pivot
+    columns of the row reduced echelon form (the same as sympy's rref).
+    Each row has its content removed after every step to keep entries small.
+    """
+    M = np.array(numerators, dtype=object)
+    rows, cols = M.shape
+    pivots = []
+    r = 0
+    for col in range(cols):
+        if r == rows:
+            break
+        nonzero = np.nonzero(M[r:, col])[0]
+        if len(nonzero) == 0:
+            continue
+        i = r + nonzero[0]
+        M[[r, i]] = M[[i, r]]
+        p = M[r, col]
+        below = M[r+1:]
+        below[:] = p*below - np.outer(below[:, col], M[r])
+        for j in range(len(below)):
+            g = math.gcd(*below[j].tolist())
+            if g > 1:
+                below[j] = below[j] // g
+        pivots.append(col)
+        r += 1
+    return pivots
+
+
+def exact_propagation(Q, V_0, emit=None):
+    """
+    Exact version of dfs.propagation. Returns the dimension of W_df, W_df
+    and the subspaces affected by noise as exact bases (W_df is None when
+    there is no decoherence free subspace). emit, if given, is dfs.emit and
+    receives the same "iteration" and "rank" events as dfs.propagation.
+    """
+    Q = integer_matrix(Q)
+    if hasattr(V_0, "toarray"):
+        V_0 = V_0.toarray()
+    V_0 = integer_matrix(V_0)
+    system_dim = Q.shape[0]
+    row_bound = max(int(np.max(abs(Q).sum(axis=1))), 1)
+
+    subspaces = orthogonal_set(system_dim)
+    W_ks = []
+    for row in V_0:
+        numerator, denominator = subspaces.project_out(row.astype(object), 1)
+        if np.any(numerator != 0): # repeated couplings add nothing
+            subspaces.append(numerator, denominator)
+        W_ks.append((numerator, denominator))
+
+    iteration = 0
+    while any(np.any(W_k[0] != 0) for W_k in W_ks):
+        if emit is not None:
+            sweep_start = time.perf_counter()
+        for i in range(len(W_ks)):
+            numerator, denominator = W_ks[i]
+            numerator = multiply(Q, numerator, row_bound)
+            numerator, denominator = subspaces.project_out(numerator, denominator)
+            accepted = bool(np.any(numerator != 0))
+            if accepted:
+                subspaces.append(numerator, denominator)
+            if emit is not None:
+                emit("rank", accepted=accepted, krylov_dim=subspaces.size)
+            W_ks[i] = (numerator, denominator)
+        iteration += 1
+        if emit is not None:
+            emit("iteration", iteration=iteration, krylov_dim=subspaces.size,
+                 seconds=time.perf_counter() - sweep_start)
+
+    Wdf_dim = system_dim - subspaces.size
+    affected = subspaces.to_basis()
+    if Wdf_dim <= 0:
+        return 0, None, affected
+
+    nodes = pivot_columns(affected.numerators)
+    df_nodes = [i for i in range(system_dim) if i not in nodes]
+    for j in df_nodes[:Wdf_dim]:
+        numerator = np.zeros(system_dim, dtype=object)
+        numerator[j] = 1
+        numerator, denominator = subspaces.project_out(numerator, 1)
+        subspaces.append(numerator, denominator)
+    W_df = subspaces.to_basis(affected.shape[0])
+    return Wdf_dim, W_df, affected
+
+
+def lanczos_dimension(Q, V_0, stream=None):
+    """
+    Dimension of W_df from an exact block Lanczos recurrence. As Q is
+    symmetric, Q times a block is already orthogonal to every block except
+    the last two, so only those are kept and memory is bounded by three
+    blocks however large the noise affected subspace is. (In floating point
+    the same recurrence slowly loses orthogonality and overcounts, which is
+    why it is done exactly.)
+
+    If stream is an open binary file, every block is also written to it as
+    float64 rows, to be read back with np.fromfile(stream).reshape(-1, N).
+    """
+    Q = integer_matrix(Q)
+    if hasattr(V_0, "toarray"):
+        V_0 = V_0.toarray()
+    V_0 = integer_matrix(V_0)
+    system_dim = Q.shape[0]
+    row_bound = max(int(np.max(abs(Q).sum(axis=1))), 1)
+
+    current = orthogonal_set(system_dim)
+    for row in V_0:
+        numerator, denominator = current.project_out(row.astype(object), 1)
+        if np.any(numerator != 0):
+            current.append(numerator, denominator)
+    previous = orthogonal_set(system_dim)
+    dim_space = 0
+    while current.size > 0:
+        dim_space += current.size
+        if stream is not None:
+            np.asarray(current.to_basis(), dtype=np.float64).tofile(stream)
+        known = orthogonal_set(system_dim) # last two blocks, then the new one
+        known.extend(previous)
+        known.extend(current)
+        start = known.size
+        for i in range(current.size):
+            numerator = multiply(Q, current.numerators[i], row_bound)
+            numerator, denominator = known.project_out(numerator, current.denominators[i])
+            if np.any(numerator != 0):
+                known.append(numerator, denominator)
+        following = orthogonal_set(system_dim)
+        following.extend(known, start)
+        previous, current = current, following
+    return system_dim - dim_space
@@ -0,0 +1,69 @@
+"""
+      Standard networks for testing and benchmarking, so that Q and V_0 can
+      be built for any size without drawing the network in the interface.
+      Every generator returns (Q, V_0); noise is a list of the nodes coupled
+      to the environment and sparse=True returns Q in CSR form.
+"""
+
+# IMPORT MODULES ==============================================================
+import itertools
+import numpy as np
+
+from network_to_matrix import edges_to_matrix
+
+#==============================================================================
+
+def chain(n, noise=(0,), sparse=False):
+    """
+    n oscillators in a line.
+    """
+    edges = [(i, i+1) for i in range(n-1)]
+    return edges_to_matrix(edges, noise, n, sparse)
+
+
+def ring(n, noise=(0,), sparse=False):
+    """
+    n oscillators in a closed loop.
+    """
+    edges = [(i, (i+1) % n) for i in range(n)]
+    return edges_to_matrix(edges, noise, n, sparse)
+
+
+def lattice(shape, noise=(0,), sparse=False):
+    """
+    Rectangular lattice with nearest neighbour couplings, of any dimension:
+    shape=(rows, cols) for 2D or (x, y, z) for 3D. Nodes are numbered in C
+    order, so node 0 is a corner.
+    """
+    labels = np.arange(int(np.prod(shape))).reshape(shape)
+    edges = []
+    for axis in range(len(shape)):
+        first = np.delete(labels, -1, axis=axis)
+        second = np.delete(labels, 0, axis=axis)
+        edges.append(np.column_stack([first.ravel(), second.ravel()]))
+    return edges_to_matrix(np.vstack(edges), noise, labels.size, sparse)
+
+
+def star(n, noise=(0,), sparse=False):
+    """
+    Node 0 coupled to each of the other n-1 nodes.
+    """
+    edges = [(0, i) for i in range(1, n)]
+    return edges_to_matrix(edges, noise, n, sparse)
+
+
+def complete(n, noise=(0,), sparse=False):
+    """
+    Every node coupled to every other node.
+    """
+    edges = list(itertools.combinations(range(n), 2))
+    return edges_to_matrix(edges, noise, n, sparse)
+
+
+def random_sparse(n, degree=3, noise=(0,), sparse=False, seed=None):
+    """
+    About n*degree/2 couplings between uniformly random pairs of nodes.
+    """
+    rng = np.random.default_rng(seed)
+    edges = rng.integers(0, n, size=(n*degree//2, 2))
+    return edges_to_matrix(edges, noise, n, sparse)
@@ -0,0 +1,288 @@
+"""
+      Keeps the subspaces affected by noise up to date while a network is
+      edited one coupling at a time, rather than rerunning dfs.propagation
+      on the whole network after every change.
+"""
+
+# IMPORT MODULES ==============================================================
+import numpy as np
+
+from dfs import eigenspace_split
+from network_to_matrix import sparse_matrix
+
+#==============================================================================
+
+class incremental_dfs:
+    """
+    The noise affected subspace is the span of V_0, QV_0, Q^2V_0, ... and is
+    stored as orthonormal rows, each labelled with the power of Q (level) it
+    was found at. Rows are found level by level, so the rows up to level k
+    span V_0, ..., Q^kV_0.
+
+    Adding a noise coupling only adds to this span, so the new rows are
+    found from the coupled node alone. Adding a coupling between nodes a and
+    b changes Q only for vectors which are non-zero at a or b: the rows
+    before the first level with such a vector are kept and only the levels
+    after it are found again.
+
+    Couplings are all 1 and Q has a zero diagonal, as built by network and
+    edges_to_matrix; any other Q raises ValueError.
+
+    Rounding errors inside W_df grow with every power of Q until they pass
+    for new rows, so after each change the new rows are pruned to the part
+    V_0 reaches (see prune). The rows are then exactly the affected
+    subspace, so an edit away from it changes nothing and Wdf_dim is read
+    off without any further work.
+    """
+    def __init__(self, Q=None, V_0=None, n_nodes=0, tol=1e-10):
+        self.tol = tol
+        self.N = n_nodes if Q is None else Q.shape[0]
+        self.neighbours = [set() for i in range(self.N)]
+        self.noise = [] # V_0 rows, as given
+        self.added = [] # couplings added since Q was built, see multiply
+        self.pairs = None # self.added as two arrays, made when needed
+        self.affected = None # found by reached, until the next edit
+        self.basis = np.zeros((4, max(self.N, 4)))
+        self.levels = np.zeros(4, dtype=int)
+        self.size = 0
+        self.ordered = True # False once levels no longer mean powers of Q
+        if Q is not None:
+            if hasattr(Q, "tocoo"):
+                Q = Q.tocoo()
+                (rows, cols, values) = (Q.row, Q.col, Q.data)
+            else:
+                Q = np.asarray(Q)
+                (rows, cols) = np.nonzero(Q)
+                values = Q[rows, cols]
+            keep = values != 0
+            if np.any(values[keep] != 1) or np.any(rows[keep] == cols[keep]):
+                raise ValueError("incremental_dfs needs every coupling in Q to be 1 and "
+                                 "a zero diagonal, as built by network")
+            for (x, y) in zip(rows[keep], cols[keep]):
+                self.neighbours[x].add(int(y))
+        edges = [(x, y) for x in range(self.N) for y in self.neighbours[x] if x < y]
+        self.Q = sparse_matrix(np.array(edges, dtype=int).reshape(-1, 2), self.N)
+        if V_0 is not None:
+            for row in np.asarray(V_0, dtype=float):
+                self.noise.append(row)
+            self.rebuild()
+
+    @property
+    def Wdf_dim(self):
+        return self.N - len(self.reached())
+
+    def subspaces(self):
+        """
+        Orthonormal basis of the subspace affected by noise, one row each.
+        """
+        return self.reached().copy()
+
+    def reached(self):
+        """
+        The rows, which close keeps pruned to the part of their span V_0
+        reaches. Kept until the next edit.
+        """
+        if self.affected is None:
+            self.affected = self.basis[:self.size, :self.N].copy()
+        return self.affected
+
+    def result(self):
+        """
+        Returns Wdf_dim, W_df and the subspaces affected by noise, like
+        dfs.propagation. W_df is orthonormal and is only found on request.
+        """
+        subspaces = self.subspaces()
+        if self.Wdf_dim == 0:
+            return 0, None, subspaces
+        if len(subspaces) == 0:
+            return self.Wdf_dim, np.eye(self.N), subspaces
+        U, s, Vt = np.linalg.svd(subspaces, full_matrices=True)
+        return self.Wdf_dim, Vt[len(subspaces):], subspaces
+
+    def copy(self):
+        other = incremental_dfs.__new__(incremental_dfs)
+        other.__dict__.update(self.__dict__)
+        other.neighbours = [set(n) for n in self.neighbours]
+        other.noise = list(self.noise)
+        other.added = list(self.added)
+        other.basis = self.basis.copy()
+        other.levels = self.levels.copy()
+        return other
+
+    def add_node(self):
+        """
+        Adds an uncoupled node, which is decoherence free by itself. Returns
+        its label.
+        """
+        self.N += 1
+        self.neighbours.append(set())
+        self.affected = None
+        if self.N > self.basis.shape[1]:
+            self.basis = np.hstack([self.basis, np.zeros_like(self.basis)])
+        self.noise = [np.append(row, 0.0) for row in self.noise]
+        return self.N - 1
+
+    def add_edge(self, a, b):
+        """
+        Couples nodes a and b, adding nodes if they do not exist yet.
+        """
+        while max(a, b) >= self.N:
+            self.add_node()
+        if a == b or b in self.neighbours[a]:
+            return
+        self.neighbours[a].add(b)
+        self.neighbours[b].add(a)
+        self.added.append((a, b))
+        self.pairs = None
+        self.affected = None
+        touched = np.nonzero(np.maximum(abs(self.basis[:self.size, a]),
+                                        abs(self.basis[:self.size, b])) > self.tol)[0]
+        if len(touched) == 0:
+            return # Q is unchanged on the affected subspace
+        if self.ordered == False:
+            self.rebuild()
+            return
+        level = self.levels[touched].min()
+        keep = int(np.sum(self.levels[:self.size] <= level))
+        self.size = keep
+        start = int(np.sum(self.levels[:keep] < level))
+        self.close(list(range(start, keep)), keep)
+
+    def add_noise(self, node):
+        """
+        Couples node to the environment, adding it if it does not exist yet.
+        """
+        while node >= self.N:
+            self.add_node()
+        vector = np.zeros(self.N)
+        vector[node] = 1.0
+        self.noise.append(vector)
+        self.ordered = False
+        self.affected = None
+        first = self.size
+        if self.append(vector, 0):
+            self.close([first], first)
+
+    def rebuild(self):
+        """
+        Finds the affected subspace from scratch, from all noise couplings.
+        """
+        self.size = 0
+        self.ordered = True
+        self.affected = None
+        for row in self.noise:
+            self.append(row, 0)
+        self.close(list(range(self.size)), 0)
+
+    def multiply(self, vectors):
+        """
+        Q times a vector, or times vectors as columns. Q is the CSR matrix
+        built last plus the couplings added since, which are merged into it
+        once there are more than one for every 16 stored, so an edit does
+        not rebuild Q.
+        """
+        if len(self.added) > max(16, self.Q.nnz//16):
+            Q = self.Q.copy() # copies share self.Q
+            Q.resize((self.N, self.N))
+            edges = np.array(self.added, dtype=int)
+            self.Q = (Q + sparse_matrix(edges, self.N)).tocsr()
+            self.added = []
+            self.pairs = None
+        n = self.Q.shape[0] # nodes added since have no stored couplings
+        result = np.zeros(vectors.shape)
+        result[:n] = self.Q @ vectors[:n]
+        if self.added:
+            if self.pairs is None:
+                self.pairs = np.transpose(self.added)
+            a, b = self.pairs
+            np.add.at(result, a, vectors[b])
+            np.add.at(result, b, vectors[a])
+        return result
+
+    def close(self, queue, first):
+        """
+        Adds Q times every row in queue, and Q times every row this adds,
+        until the span is invariant under Q. Rows are handled first in
+        first out, so their levels stay in order. The rows from first on are
+        new and are pruned afterwards; the rows before first must already
+        be reached, and only those in queue may have Q reach past them.
+        """
+        seeds = [self.basis[row, :self.N].copy() for row in queue if row >= first]
+        level = min((self.levels[row] + (row < first) for row in queue), default=0)
+        position = 0
+        while position < len(queue):
+            row = queue[position]
+            position += 1
+            vector = self.multiply(self.basis[row, :self.N])
+            if row < first:
+                seeds.append(vector) # how Q reaches the new rows
+            if self.append(vector, self.levels[row] + 1):
+                queue.append(self.size - 1)
+        self.prune(first, seeds, level)
+
+    def prune(self, first, seeds, level):
+        """
+        Replaces the rows from first on by the part of their span which the
+        seeds reach, as in dfs.reached but with Q restricted to the new rows
+        only, so the cost grows with the change rather than the network.
+        The rows left are put back in order level by level, the seeds at
+        level, as if they had been found without rounding errors.
+        """
+        K = self.basis[first:self.size, :self.N].copy()
+        self.size = first
+        self.affected = None
+        if len(K) == 0:
+            return
+        T = K @ self.multiply(np.transpose(K))
+        values, vectors = np.linalg.eigh((T + np.transpose(T))/2)
+        S = np.array(seeds).reshape(-1, self.N) @ np.transpose(K)
+        affected, free = eigenspace_split(values, vectors, S)
+        # the same propagation as close, on coordinates in affected
+        T = affected @ T @ np.transpose(affected)
+        current = S @ np.transpose(affected)
+        found = np.zeros((len(affected), len(affected)))
+        levels = []
+        while len(current) and len(levels) < len(found):
+            start = len(levels)
+            for vector in current:
+                count = len(levels)
+                scale = max(np.linalg.norm(vector), 1.0)
+                for sweep in range(2):
+                    vector = vector - (found[:count] @ vector) @ found[:count]
+                norm = np.linalg.norm(vector)
+                if norm > self.tol*scale and count < len(found):
+                    found[count] = vector/norm
+                    levels.append(level)
+            current = found[start:len(levels)] @ T
+            level += 1
+        rows = found[:len(levels)] @ (affected @ K)
+        for (vector, level) in zip(rows, levels):
+            self.store(vector, level)
+
+    def store(self, vector, level):
+        """
+        Adds vector, already normalised and orthogonal to the rows, as a row.
+        """
+        if self.size == len(self.basis):
+            self.basis = np.vstack([self.basis, np.zeros_like(self.basis)])
+            self.levels = np.concatenate([self.levels, np.zeros_like(self.levels)])
+        self.basis[self.size, :self.N] = vector
+        self.basis[self.size, self.N:] = 0.0
+        self.levels[self.size] = level
+        self.size += 1
+
+    def append(self, vector, level):
+        """
+        Orthogonalises vector against the basis (twice, for stability) and
+        adds it if anything is left. Returns whether it was added.
+        """
+        scale = max(np.linalg.norm(vector), 1.0)
+        B = self.basis[:self.size, :self.N]
+        for sweep in range(2):
+            vector = vector - (B @ vector) @ B
+        norm = np.linalg.norm(vector)
+        if norm <= self.tol*scale:
+            return False
+        self.affected = None
+        self.store(vector/norm, level)
+        return True
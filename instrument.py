@@ -0,0 +1,69 @@
+"""
+      Ready made hooks for dfs.add_hook, to profile a calculation or watch
+      its progress instead of reading the printed matrices.
+
+      profile = profiler()
+      DFS = dfs(Q, V_0, verbose=False, hooks=[profile])
+      DFS.solve("block")
+      print(profile.summary())
+"""
+
+# IMPORT MODULES ==============================================================
+import json
+import time
+
+#==============================================================================
+
+class profiler:
+    """
+    Collects every event: totals and counts of the timed ones, the growth
+    of the Krylov dimension per iteration and how many vectors were kept
+    or rejected as dependent.
+    """
+    def __init__(self):
+        self.totals = {} # seconds spent in each timed event
+        self.counts = {} # number of each event
+        self.growth = [] # (iteration, krylov_dim, seconds)
+        self.accepted = 0
+        self.rejected = 0
+        self.Wdf_dim = None
+
+    def __call__(self, event, data):
+        self.counts[event] = self.counts.get(event, 0) + 1
+        if "seconds" in data:
+            self.totals[event] = self.totals.get(event, 0.0) + data["seconds"]
+        if event == "iteration":
+            self.growth.append((data["iteration"], data["krylov_dim"], data["seconds"]))
+        elif event == "rank":
+            if data["accepted"]:
+                self.accepted += 1
+            else:
+                self.rejected += 1
+        elif event == "result":
+            self.Wdf_dim = data["Wdf_dim"]
+
+    def summary(self):
+        return {
+            "Wdf_dim": self.Wdf_dim,
+            "iterations": len(self.growth),
+            "krylov_dim": self.growth[-1][1] if self.growth else None,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "seconds": dict(self.totals),
+            "counts": dict(self.counts),
+        }
+
+
+class event_log:
+    """
+    Writes each event as a line of JSON, with the time since the log was
+    made, to an open text file (for example sys.stderr).
+    """
+    def __init__(self, file):
+        self.file = file
+        self.start = time.perf_counter()
+
+    def __call__(self, event, data):
+        record = {"event": event, "elapsed": time.perf_counter() - self.start}
+        record.update(data)
+        self.file.write(json.dumps(record) + "\n")
@@ -1,4 +1,7 @@
 # IMPORT MODULES ==============================================================
+import queue
+import threading
+import time
 import tkinter as tk
 from tkinter import ttk
 from tkinter import messagebox
@@ -31,6 +34,7 @@ class Mastermind(tk.Tk):
              self.winfo_screenwidth()/self.cols,
              self.winfo_screenheight()/self.rows))
          
+         self.resize_job = None # pending resize, see resize_window
          self.bind("<Configure>", self.resize_window)
  
          self.noise_position = (3,1) # location of node which represents noise
@@ -58,19 +62,60 @@ class Mastermind(tk.Tk):
          
     def resize_window(self,event):
         """
-        Allows user to resize window, so frame resizes accordingly.
+        Allows user to resize window, so frame resizes accordingly. Every 
+        widget reports <Configure> to the window, and dragging sends a 
+        stream of them, so only the window's own events count and the 
+        resize waits until they have stopped for 100ms.
         """
-        self.cell_size = np.floor(min(
-            event.width/self.cols,
-            event.height/self.rows))
+        if event.widget is not self:
+            return
+        if self.resize_job is not None:
+            self.after_cancel(self.resize_job)
+        self.resize_job = self.after(100, self.apply_resize)
+
+    def apply_resize(self):
+        """
+        Scales every frame to the current size of the window.
+        """
+        self.resize_job = None
+        cell_size = np.floor(min(
+            self.winfo_width()/self.cols,
+            self.winfo_height()/self.rows))
+        if cell_size <= 0 or cell_size == self.cell_size:
+            return
+        factor = cell_size/self.cell_size
+        self.cell_size = cell_size
         for frame in self.frames.values():
-            frame.resize_frame()
+            frame.resize_frame(factor)
 
 class ResizableFrame(tk.Frame):
     def __init__(self,parent):
         tk.Frame.__init__(self,parent)
-    def resize_frame(self):
-        pass
+
+    def draw_grid_lines(self):
+        """
+        Draws the grid as one line per row and column, tagged "grid", rather
+        than a rectangle per cell.
+        """
+        width = self.cols*self.cell_size
+        height = self.rows*self.cell_size
+        for i in range(self.rows + 1):
+            self.canvas.create_line(0, i*self.cell_size, width, i*self.cell_size,
+                                    fill="purple", tags="grid")
+        for j in range(self.cols + 1):
+            self.canvas.create_line(j*self.cell_size, 0, j*self.cell_size, height,
+                                    fill="purple", tags="grid")
+
+    def resize_frame(self, factor):
+        """
+        Scales everything already drawn on the canvas by factor, instead of
+        deleting and drawing it again, and moves the button to the corner.
+        """
+        self.cell_size = self.controller.cell_size
+        self.canvas.scale("all", 0, 0, factor, factor)
+        self.canvas.config(width=self.cols*self.cell_size, height=self.rows*self.cell_size)
+        self.btn.place(x= (self.cell_size*self.cols) - self.btn_offset,
+                       y= (self.cell_size*self.rows) - self.btn_offset)
 
 class input_network(ResizableFrame):  
     def __init__(self, parent, controller):
@@ -91,6 +136,7 @@ class input_network(ResizableFrame):
         self.canvas.bind("<Button-1>", self.line) # binds mouseclick event to add_node
         
         self.btn = ttk.Button(self, text = 'Next', command = lambda: self.ask_yes_no())
+        self.btn_offset = 100
         self.btn.pack(expand = True)
         self.btn.place(x= (self.cell_size*self.cols) - 100 , y= (self.cell_size*self.rows) - 100)
           
@@ -114,15 +160,9 @@ class input_network(ResizableFrame):
         
     def draw_grid(self): 
         """
-        Loops over each row and column, draws the grid for the interface.
+        Draws the grid for the interface.
         """
-        for i in range(self.rows):
-            for j in range(self.cols):
-                x1 = j * self.cell_size
-                y1 = i * self.cell_size
-                x2 = x1 + self.cell_size
-                y2 = y1 + self.cell_size
-                self.canvas.create_rectangle(x1, y1, x2, y2, outline="purple") # draws the grid
+        self.draw_grid_lines()
                 
     def coords(self, x,y): 
         """
@@ -190,21 +230,6 @@ class input_network(ResizableFrame):
         result = messagebox.askyesno("Proceed", "Have you completed the network?")
         if result == True:
             self.controller.show_frame("describe_system")
-            
-    def resize_frame(self):
-        """
-        Allows frame to be resized if user changed size of window
-        """
-        self.cell_size = self.controller.cell_size
-        self.canvas.delete("all")
-        self.draw_grid()
-        self.add_text()
-        for (row,col) in self.controller.node_positions:
-            self.draw_node(row,col,"purple")
-        for (r1,c1,r2,c2) in self.controller.node_connections:
-            x1,y1=self.position(c1*self.cell_size,r1*self.cell_size)
-            x2,y2=self.position(c2*self.cell_size,r2*self.cell_size)
-            self.canvas.create_line(x1, y1, x2, y2)
     
 class describe_system(ResizableFrame):
     def __init__(self, parent, controller):
@@ -221,19 +246,14 @@ class describe_system(ResizableFrame):
         
     def draw_grid(self): 
         """
-        Loops over each row and column, draws the grid for the interface.
+        Draws the grid for the interface.
         """
-        for i in range(self.rows):
-            for j in range(self.cols):
-                x1 = j * self.cell_size
-                y1 = i * self.cell_size
-                x2 = x1 + self.cell_size
-                y2 = y1 + self.cell_size
-                self.canvas.create_rectangle(x1, y1, x2, y2, outline="purple") # draws the grid 
+        self.draw_grid_lines()
         self.canvas.create_text((self.cols*self.cell_size/2, 20), font = title,text = "MATRIX REPRESENTATION OF THE NETWORK.")
-        btn = ttk.Button(self, text='Next', command = lambda: self.controller.show_frame("results")) 
-        btn.pack()
-        btn.place(x= (self.cell_size*self.cols) - 80 , y= (self.cell_size*self.rows) - 80)
+        self.btn = ttk.Button(self, text='Next', command = lambda: self.controller.show_frame("results")) 
+        self.btn_offset = 80
+        self.btn.pack()
+        self.btn.place(x= (self.cell_size*self.cols) - 80 , y= (self.cell_size*self.rows) - 80)
         
     def tkraise(self):
         """
@@ -298,28 +318,28 @@ class results(ResizableFrame):
       self.V_0 = controller.V_0
       self.W_df = controller.W_df
 
+      self.job = None # worker thread running dfs, see tkraise
+      self.messages = queue.Queue() # progress and the result, from the worker
+      self.cancel = threading.Event()
+
       self.canvas = Canvas(self, width= self.cols * self.cell_size, height=self.rows * self.cell_size)  
       self.canvas.pack() 
       self.draw_grid()
+      self.cancel_btn = ttk.Button(self, text='Cancel', command = self.cancel_job)
       
     def draw_grid(self): 
         """
-        Loops over each row and column, draws the grid for the interface.
+        Draws the grid for the interface.
         """
-        for i in range(self.rows):
-             for j in range(self.cols):
-                 x1 = j * self.cell_size
-                 y1 = i * self.cell_size                  
-                 x2 = x1 + self.cell_size
-                 y2 = y1 + self.cell_size
-                 self.canvas.create_rectangle(x1, y1, x2, y2, outline="purple") # draws the grid 
+        self.draw_grid_lines()
         header = "CONCLUSIONS: IS THERE A DECOHERENCE FREE SUBSPACE?"
         self.canvas.create_text((self.cols*self.cell_size/2, 20), font = title,text = header)
         disclaimer = "If vector elements overlap or are illegible, these subspaces may be found in the Python console."
         self.canvas.create_text((self.cols*self.cell_size/2, 60), font = text, text = disclaimer)
-        btn = ttk.Button(self, text='Next', command = self.destroy)
-        btn.pack()
-        btn.place(x= (self.cell_size*self.cols) - 80 , y= (self.cell_size*self.rows) - 80)
+        self.btn = ttk.Button(self, text='Next', command = self.destroy)
+        self.btn_offset = 80
+        self.btn.pack()
+        self.btn.place(x= (self.cell_size*self.cols) - 80 , y= (self.cell_size*self.rows) - 80)
     
             
     def draw_subspaces(self, Wdf_dim, dfs, subspaces):
@@ -361,10 +381,106 @@ class results(ResizableFrame):
     def tkraise(self):
         """
         Action upon user pressing 'next' button. Calls dfs class to find the 
-        subspaces formed by decoherence and W_df, if it exists.
+        subspaces formed by decoherence and W_df, if it exists. dfs runs on
+        a worker thread so the window stays responsive; poll shows its 
+        progress and draws the result when it is done.
         """
-        DFS = dfs(self.controller.Q, self.controller.V_0)
-        Wdf_dim, W_df, Subspaces = DFS.propagation()
+        super().tkraise()
+        if self.job is not None and self.job.is_alive():
+            return
+        self.cancel.clear()
+        self.start = time.perf_counter()
+        self.canvas.delete("progress")
+        self.canvas.create_text((9.5*self.cell_size, 110), font = text, 
+                                text = "Calculating...", tags = "progress")
+        self.cancel_btn.config(text = 'Cancel', state = "normal")
+        self.place_cancel()
+        self.job = threading.Thread(target = self.run_job, 
+                                    args = (self.controller.Q, self.controller.V_0), daemon = True)
+        self.job.start()
+        self.after(100, self.poll)
+
+    def place_cancel(self):
+        """
+        Puts the Cancel button to the left of the Next button.
+        """
+        self.cancel_btn.place(x= (self.cell_size*self.cols) - 180 , y= (self.cell_size*self.rows) - 80)
+
+    def resize_frame(self, factor):
+        """
+        As for any frame, and moves the Cancel button too while it is shown.
+        """
+        ResizableFrame.resize_frame(self, factor)
+        if self.cancel_btn.winfo_manager() == "place":
+            self.place_cancel()
+
+    def run_job(self, Q, V_0):
+        """
+        Runs on the worker thread; never touches tkinter, only the queue.
+        The certified engine gives the exact fractions shown, without the
+        sympy rref of dfs.propagation, and emits an event after each phase
+        (and each step of its exact fallback), where Cancel is acted on.
+        """
+        try:
+            DFS = dfs(Q, V_0, verbose=False, hooks=[self.progress])
+            result = DFS.solve("certified")
+            if self.cancel.is_set(): # pressed after the last event
+                raise _cancelled()
+            self.messages.put(("done", result))
+        except _cancelled:
+            self.messages.put(("cancelled", None))
+        except Exception as error:
+            self.messages.put(("error", error))
+
+    def progress(self, event, data):
+        """
+        dfs hook, called on the worker thread. Passes on the Krylov dimension
+        and stops the calculation once Cancel has been pressed.
+        """
+        if self.cancel.is_set():
+            raise _cancelled()
+        if "krylov_dim" in data:
+            self.messages.put(("progress", data["krylov_dim"]))
+
+    def cancel_job(self):
+        self.cancel.set()
+        self.cancel_btn.config(text = 'Cancelling...', state = "disabled")
+
+    def poll(self):
+        """
+        Reads the messages from the worker, every 100ms until it finishes.
+        """
+        krylov_dim = None
+        try:
+            while True:
+                kind, value = self.messages.get_nowait()
+                if kind == "progress":
+                    krylov_dim = value
+                else:
+                    self.finish(kind, value)
+                    return
+        except queue.Empty:
+            pass
+        status = "Calculating... %.1fs"%(time.perf_counter() - self.start)
+        if krylov_dim is not None:
+            status += ", %d subspaces affected by noise so far"%(krylov_dim)
+        self.canvas.itemconfig("progress", text = status)
+        self.after(100, self.poll)
+
+    def finish(self, kind, value):
+        """
+        Replaces the progress message with the result of the worker.
+        """
+        self.canvas.delete("progress")
+        self.cancel_btn.place_forget()
+        if kind == "cancelled":
+            heading = "The calculation was cancelled."
+            self.canvas.create_text((9.5*self.cell_size, 110), font = text, text = heading, tags = "progress")
+            return
+        if kind == "error":
+            messagebox.showerror("Error", "The calculation failed: %s"%(value))
+            return
+        Wdf_dim, W_df, Subspaces = value
         if Wdf_dim == 0:
             heading = "No, there is no Decoherence Free Subspace."
             self.canvas.create_text((9.5*self.cell_size, 110), font = text, text = heading)
@@ -372,8 +488,14 @@ class results(ResizableFrame):
             heading = ("Yes, there is a Decoherence Free Subspace of dimension %d"%(Wdf_dim))
             self.canvas.create_text((9.5*self.cell_size, 110), font = text, text = heading)
         self.draw_subspaces(Wdf_dim, W_df, Subspaces)
-        super().tkraise()
+
+
+class _cancelled(Exception):
+    """
+    Raised by results.progress on the worker thread to stop dfs.
+    """
   
-app = Mastermind()
-app.attributes("-zoomed", True)
-app.mainloop()
+if __name__ == "__main__":
+    app = Mastermind()
+    app.attributes("-zoomed", True)
+    app.mainloop()
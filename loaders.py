@@ -0,0 +1,217 @@
+"""
+      Reads large networks from files instead of the interface: edge lists,
+      Matrix Market files and numpy .npy/.npz files. Q and V_0 are built
+      with array operations, so a million couplings load in seconds.
+"""
+
+# IMPORT MODULES ==============================================================
+import mmap
+import os
+import re
+import numpy as np
+
+from network_to_matrix import edges_to_matrix
+
+#==============================================================================
+
+CHUNK = 2**22 # bytes of an edge list parsed at once
+
+
+def read_edge_list(path):
+    """
+    Reads an edge list with one coupling per line, "node1 node2", separated
+    by spaces, tabs or commas. A third column of weights is accepted if
+    every weight is 1, as every coupling counts as 1 (use a Matrix Market
+    file for a weighted Q). A line "noise node" (either way round) couples
+    that node to the environment, like the blue noise node in the
+    interface. Anything after a # or % is a comment. Returns an (E, 2)
+    array of couplings and an array of the nodes coupled to noise; raises
+    ValueError naming the first line which is not like this.
+
+    The file is memory mapped and parsed CHUNK bytes (whole lines) at a
+    time, so only one chunk of the text is copied into memory at once.
+    """
+    edges = [np.zeros((0, 2), dtype=np.int64)]
+    noise = [np.zeros(0, dtype=np.int64)]
+    with open(path, "rb") as file:
+        size = os.fstat(file.fileno()).st_size
+        if size == 0:
+            return edges[0], noise[0]
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            first = 0
+            line = 1 # number of the first line in the chunk
+            while first < size:
+                last = size
+                if first + CHUNK < size: # end the chunk after a whole line
+                    last = data.rfind(b"\n", first, first + CHUNK) + 1
+                    if last <= first: # one line longer than CHUNK
+                        last = data.find(b"\n", first + CHUNK) + 1 or size
+                chunk = data[first:last]
+                found = parse_edges(chunk, path, line)
+                edges.append(found[0])
+                noise.append(found[1])
+                line += chunk.count(b"\n")
+                first = last
+    return np.concatenate(edges), np.concatenate(noise)
+
+
+def parse_edges(text, path, line):
+    """
+    Couplings and noise nodes in text, whole lines of an edge list whose
+    first is line number line. See read_edge_list.
+    """
+    original = text
+    if b"#" in text or b"%" in text:
+        text = re.sub(rb"[#%][^\n]*", b"", text)
+    if b"-" in text: # node labels are not negative, and -1 marks noise below
+        bad_line(path, line, original, text[:text.index(b"-")].count(b"\n"))
+    text = text.replace(b",", b" ")
+    if b"noise" in text: # only the whole word, so "noise5" is a bad line
+        text = re.sub(rb"(?<!\S)noise(?!\S)", b"-1", text)
+    # values on each line, from where runs of non-blank bytes start
+    chars = np.frombuffer(text, dtype=np.uint8)
+    blank = chars <= ord(" ") # space, tab and line ends
+    starts = np.flatnonzero(~blank & np.concatenate([[True], blank[:-1]]))
+    newlines = np.flatnonzero(chars == ord("\n"))
+    counts = np.bincount(np.searchsorted(newlines, starts), minlength=len(newlines) + 1)
+    values = read_values(text, np.int64)
+    if values is None or len(values) != len(starts): # weights like 1.0
+        values = read_values(text, float)
+    if values is None or len(values) != len(starts):
+        bad_line(path, line, original, first_unreadable(text.split(b"\n")))
+    rows = np.nonzero(counts)[0]
+    if np.any((counts[rows] != 2) & (counts[rows] != 3)):
+        bad_line(path, line, original, rows[(counts[rows] != 2) & (counts[rows] != 3)][0])
+    first = (np.cumsum(counts) - counts)[rows]
+    nodes = np.column_stack([values[first], values[first + 1]])
+    weights = np.where(counts[rows] == 3, values[np.minimum(first + 2, len(values) - 1)], 1)
+    is_noise = np.any(nodes == -1, axis=1)
+    wrong = np.all(nodes == -1, axis=1) | (weights != 1) | np.any(nodes < -1, axis=1)
+    if values.dtype.kind == "f":
+        wrong |= np.any((nodes != np.round(nodes)) | np.isinf(nodes), axis=1)
+    if np.any(wrong):
+        bad_line(path, line, original, rows[wrong][0])
+    nodes = nodes.astype(np.int64)
+    noise = nodes[is_noise].max(axis=1) # the other end of a noise coupling
+    return nodes[~is_noise], noise
+
+
+def read_values(text, dtype):
+    """
+    The numbers in text, or None if there is something else, which older
+    numpy only warns about, returning the numbers before it.
+    """
+    import warnings
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", DeprecationWarning)
+            return np.fromstring(text, dtype=dtype, sep=" ")
+    except ValueError:
+        return None
+
+
+def bad_line(path, line, text, i):
+    """
+    Raises the ValueError for line i of text, whose first line is line
+    number line of the file at path.
+    """
+    text = text.split(b"\n")[i].decode(errors="replace").strip()
+    if len(text) > 60:
+        text = text[:57] + "..."
+    raise ValueError("%s, line %d: expected \"node1 node2\", \"node1 node2 1\" or "
+                     "\"noise node\", not %r"%(path, line + i, text))
+
+
+def first_unreadable(lines):
+    """
+    Index of the first line holding something which is not a number.
+    """
+    for i, l in enumerate(lines):
+        try:
+            [float(token) for token in l.split()]
+        except ValueError:
+            return i
+    return 0
+
+
+def read_matrix_market(path):
+    """
+    Q from a Matrix Market file, as a CSR matrix.
+    """
+    from scipy import io
+    return io.mmread(path).tocsr()
+
+
+def read_npz(path):
+    """
+    Reads a .npz file holding either a sparse Q saved by scipy.sparse.save_npz,
+    a dense "Q" or an "edges" array, optionally with "noise" (nodes) or
+    "V_0". Returns Q and the edges (one of them None) and the noise
+    couplings found, if any.
+    """
+    Q = None
+    edges = None
+    with np.load(path) as data:
+        keys = set(data.files)
+        if "indptr" in keys:
+            from scipy import sparse
+            Q = sparse.load_npz(path).tocsr()
+        elif "Q" in keys:
+            Q = data["Q"]
+        elif "edges" in keys:
+            edges = data["edges"].reshape(-1, 2)
+        else:
+            raise ValueError("%s: no Q or edges array"%(path))
+        if "V_0" in keys:
+            noise = data["V_0"]
+        elif "noise" in keys:
+            noise = data["noise"]
+        else:
+            noise = None
+    return Q, edges, noise
+
+
+def load_network(path, noise=(), n_nodes=None, sparse=True):
+    """
+    Loads Q and V_0 from path, choosing the reader by file extension:
+    .mtx/.mm Matrix Market, .npz (see read_npz), .npy an (E, 2) array of
+    couplings read through a memory map, anything else an edge list.
+    noise adds further nodes coupled to the environment.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    Q = None
+    edges = None
+    file_noise = None
+    if extension in (".mtx", ".mm"):
+        Q = read_matrix_market(path)
+    elif extension == ".npz":
+        Q, edges, file_noise = read_npz(path)
+    elif extension == ".npy":
+        edges = np.load(path, mmap_mode="r").reshape(-1, 2)
+    else:
+        edges, file_noise = read_edge_list(path)
+
+    extra = np.asarray(noise, dtype=np.int64).ravel()
+    V_0 = None
+    if file_noise is not None and np.ndim(file_noise) == 2:
+        V_0 = np.asarray(file_noise, dtype=float) # a full V_0 was stored
+        if n_nodes is None:
+            n_nodes = V_0.shape[1]
+    elif file_noise is not None:
+        extra = np.concatenate([np.asarray(file_noise, dtype=np.int64).ravel(), extra])
+
+    if edges is not None:
+        Q, noise_vectors = edges_to_matrix(edges, extra, n_nodes, sparse)
+    else:
+        if sparse == False and hasattr(Q, "toarray"):
+            Q = Q.toarray()
+        elif sparse == True and not hasattr(Q, "tocsr"):
+            from scipy import sparse as sp
+            Q = sp.csr_matrix(Q)
+        if np.any((extra < 0) | (extra >= Q.shape[0])):
+            raise ValueError("%s: noise nodes must be from 0 to %d"%(path, Q.shape[0] - 1))
+        noise_vectors = np.zeros((len(extra), Q.shape[0]))
+        noise_vectors[np.arange(len(extra)), extra] = 1
+    if V_0 is not None:
+        noise_vectors = np.vstack([V_0, noise_vectors])
+    return Q, noise_vectors
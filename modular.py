@@ -0,0 +1,160 @@
+"""
+      Dimension of W_df only, from the rank of the Krylov space
+      [V_0, Q V_0, Q^2 V_0, ...] computed modulo primes just below 2^20.
+      Q and V_0 must be integer, as network makes them. The rank modulo p
+      is never more than the true rank and equals it for all but a few
+      primes, so the largest rank over two or three primes is the true one
+      with overwhelming probability. No sympy and no fractions are used, so
+      it is suited to screening many networks.
+
+      Residues are whole numbers below 2^20 stored as float64, so that the
+      products go through BLAS. Every partial sum is kept below 2^53, where
+      float64 holds integers exactly, so the arithmetic is exact.
+"""
+
+# IMPORT MODULES ==============================================================
+import numpy as np
+
+from exact import integer_matrix
+
+#==============================================================================
+
+# primes below 2^20, so a product of two residues is below 2^40
+PRIMES = (1048573, 1048571, 1048559, 1048549, 1048517)
+
+CHUNK = 2**12 # terms summed before reducing modulo p, 2^12 * 2^40 < 2^53
+
+
+def mod(x, p):
+    """
+    x modulo p for float64 arrays of whole numbers below 2^53.
+    """
+    r = x - p*np.floor(x/p)
+    r[r < 0] += p # x/p may round either way
+    r[r >= p] -= p
+    return r
+
+
+def matmul(A, B, p):
+    """
+    A @ B modulo p for residues, splitting the inner dimension so the sums
+    stay exact.
+    """
+    if A.shape[1] <= CHUNK:
+        return mod(A @ B, p)
+    result = np.zeros((A.shape[0], B.shape[1]))
+    for first in range(0, A.shape[1], CHUNK):
+        part = slice(first, first + CHUNK)
+        result = mod(result + A[:, part] @ B[part], p)
+    return result
+
+
+def reduce_Q(Q, p):
+    """
+    Q modulo p, ready for multiply_Q: int64 if sparse, float64 if dense.
+    """
+    if hasattr(Q, "tocsr"):
+        Q = Q.tocsr(copy=True)
+        Q.data %= p
+        return Q
+    return (Q % p).astype(float)
+
+
+def multiply_Q(Q, rows, p):
+    """
+    (Q @ rows^T)^T modulo p. A sparse Q (entries already reduced modulo p,
+    as int64) is applied in int64, where the sums cannot overflow.
+    """
+    if hasattr(Q, "tocsr"):
+        result = np.asarray(Q @ np.transpose(rows).astype(np.int64)) % p
+        return np.transpose(result).astype(float)
+    return np.transpose(matmul(Q, np.transpose(rows), p))
+
+
+def row_reduce(block, p):
+    """
+    Reduced row echelon form of block modulo p. Returns the nonzero rows,
+    each with a 1 in its pivot column and 0 in the others, and the pivots.
+    """
+    rows = []
+    pivots = []
+    for row in block:
+        if pivots:
+            row = mod(row - matmul(row[None, pivots], np.array(rows), p)[0], p)
+        nonzero = np.flatnonzero(row)
+        if len(nonzero) == 0:
+            continue
+        pivot = int(nonzero[0])
+        row = mod(row*pow(int(row[pivot]), p - 2, p), p) # modular inverse
+        for i in range(len(rows)): # clear the new pivot from earlier rows
+            rows[i] = mod(rows[i] - rows[i][pivot]*row, p)
+        rows.append(row)
+        pivots.append(pivot)
+    if not rows:
+        return np.zeros((0, block.shape[1])), []
+    return np.array(rows), pivots
+
+
+def krylov_rank(Q, V_0, p):
+    """
+    Dimension of the Krylov space of V_0 under Q over the integers modulo p.
+    The rows found at each step are reduced against all earlier ones, so
+    the basis B is in echelon form and C = B[:, pivots] is unit upper
+    triangular. Keeping the inverse of C, a new block v is reduced with two
+    products, v - (v[:, pivots] C^-1) B, and only the new rows are
+    multiplied by Q. B and C^-1 are grown by doubling.
+    """
+    N = Q.shape[0]
+    Q = reduce_Q(Q, p)
+    B = np.zeros((max(len(V_0), 1), N))
+    C_inv = np.zeros((len(B), len(B)))
+    pivots = []
+    block = mod(np.asarray(V_0, dtype=float), p)
+    while len(block) > 0:
+        k = len(pivots)
+        if k:
+            coefficients = matmul(block[:, pivots], C_inv[:k, :k], p)
+            block = mod(block - matmul(coefficients, B[:k], p), p)
+        new, new_pivots = row_reduce(block, p)
+        r = len(new)
+        if r == 0:
+            break
+        if k + r > len(B):
+            size = len(B)
+            while size < k + r:
+                size *= 2
+            size = min(size, N)
+            bigger = np.zeros((size, N))
+            bigger[:k] = B[:k]
+            B = bigger
+            bigger = np.zeros((size, size))
+            bigger[:k, :k] = C_inv[:k, :k]
+            C_inv = bigger
+        # C = [[C, X], [0, I]] so C^-1 = [[C^-1, -C^-1 X], [0, I]]
+        if k:
+            C_inv[:k, k:k + r] = mod(-matmul(C_inv[:k, :k], B[:k][:, new_pivots], p), p)
+        C_inv[k:k + r, k:k + r] = np.eye(r)
+        B[k:k + r] = new
+        pivots.extend(new_pivots)
+        if k + r == N:
+            break
+        block = multiply_Q(Q, new, p)
+    return len(pivots)
+
+
+def modular_dimension(Q, V_0, primes=2):
+    """
+    Dimension of W_df, N minus the largest Krylov rank modulo the first
+    primes entries of PRIMES. Stops early if a rank is already N.
+    """
+    Q = integer_matrix(Q)
+    if hasattr(V_0, "toarray"):
+        V_0 = V_0.toarray()
+    V_0 = integer_matrix(V_0).reshape(-1, Q.shape[0])
+    N = Q.shape[0]
+    rank = 0
+    for p in PRIMES[:primes]:
+        rank = max(rank, krylov_rank(Q, V_0, p))
+        if rank == N:
+            break
+    return N - rank
@@ -34,34 +34,126 @@ class network:
                 (adjacent_pts[i][0], adjacent_pts[i][1]) = (int(node1),int(node2))
         return adjacent_pts, noise               
 
-    def build_matrix(self, adjacent_pts): 
+    def build_matrix(self, adjacent_pts, sparse=False): 
         """
         From list of node adjacencies, system matrix Q is returned.
+        If sparse is True, Q is returned in CSR form so that its memory
+        scales with the number of couplings rather than N^2.
         """
+        if sparse == True:
+            return self.build_sparse_matrix(adjacent_pts)
+        pts = np.asarray(adjacent_pts, dtype=int).reshape(-1, 2)
+        pts = pts[np.any(pts != 0, axis=1)] # (0,0) rows are noise couplings
         Q = np.zeros((self.N-1,self.N-1))
-        for i in range(0, len(adjacent_pts)):
-            (x,y) = (int(adjacent_pts[i][0]),int(adjacent_pts[i][1]))
-            if (x,y) != (0,0):
-                Q[x][y] = 1
-                Q[y][x] = 1
+        Q[pts[:, 0], pts[:, 1]] = 1
+        Q[pts[:, 1], pts[:, 0]] = 1
         return Q    
 
+    def build_sparse_matrix(self, adjacent_pts):
+        """
+        CSR version of build_matrix. Every coupling is set to 1, as in the 
+        dense matrix, even if it was drawn more than once.
+        """
+        pts = np.asarray(adjacent_pts, dtype=int).reshape(-1, 2)
+        pts = pts[np.any(pts != 0, axis=1)] # (0,0) rows are noise couplings
+        return sparse_matrix(pts, self.N-1)
+
     def noise_vector(self, noise):
         """
         Returns couplings to noise in vector form, ie: first subspace V_0.
         """
+        noise = np.asarray(noise, dtype=int)
         V_0 = np.zeros((len(noise),self.N-1))
-        for i in range(0,len(noise)): 
-            V_0[i][int(noise[i])] = 1 
+        V_0[np.arange(len(noise)), noise] = 1 
         return V_0
 
-    def output_matrix(self):
+    def components(self):
+        """
+        Splits the network into its connected components, with the noise
+        couplings grouped as in components.split: a list of (nodes, noise),
+        where noise lists the rows of V_0 acting on the component.
+        """
+        from components import split # components imports this module
+        Q, V_0 = self.output_matrix(sparse=True)
+        return split(Q, V_0)
+
+    def output_matrix(self, sparse=False):
         """
         Completes all the steps required to convert list and disctionary which 
         are input to return the Q matrix and noise vectors.
         """
         adjacent_pts, noise = self.adjacency()
-        Q = self.build_matrix(adjacent_pts)
+        Q = self.build_matrix(adjacent_pts, sparse)
         V_0 = self.noise_vector(noise)
         return Q, V_0
-        
\ No newline at end of file
+
+
+def sparse_matrix(edges, n_nodes):
+    """
+    Symmetric CSR matrix with a 1 for every pair of nodes in edges. Every 
+    coupling is set to 1, as in the dense matrix, even if it is repeated.
+    """
+    from scipy import sparse # only needed for large networks
+    
+    rows = np.concatenate([edges[:, 0], edges[:, 1]])
+    cols = np.concatenate([edges[:, 1], edges[:, 0]])
+    values = np.ones(len(rows))
+    Q = sparse.csr_matrix((values, (rows, cols)), shape=(n_nodes, n_nodes))
+    Q.sum_duplicates()
+    Q.data[:] = 1 # repeated couplings are not added together
+    return Q
+
+
+def edges_to_matrix(edges, noise, n_nodes=None, sparse=False):
+    """
+    Builds Q and V_0 straight from node labels, without the coordinates used
+    by the interface. edges is a list of (node1, node2) pairs, noise a list 
+    of the nodes coupled to the environment and nodes are labelled from 0
+    to n_nodes - 1; raises ValueError for any other label.
+    """
+    edges = np.asarray(edges, dtype=int).reshape(-1, 2)
+    edges = edges[edges[:, 0] != edges[:, 1]] # a node is not coupled to itself
+    noise = np.asarray(noise, dtype=int).ravel()
+    if n_nodes is None:
+        n_nodes = int(max(edges.max(initial=-1), noise.max(initial=-1)) + 1)
+    if (edges.min(initial=0) < 0 or noise.min(initial=0) < 0
+            or max(edges.max(initial=-1), noise.max(initial=-1)) >= n_nodes):
+        raise ValueError("nodes must be labelled from 0 to %d"%(n_nodes - 1))
+    if sparse == True:
+        Q = sparse_matrix(edges, n_nodes)
+    else:
+        Q = np.zeros((n_nodes, n_nodes))
+        Q[edges[:, 0], edges[:, 1]] = 1
+        Q[edges[:, 1], edges[:, 0]] = 1
+    V_0 = np.zeros((len(noise), n_nodes))
+    V_0[np.arange(len(noise)), noise] = 1
+    return Q, V_0
+
+
+def connected_components(edges, n_nodes, groups=()):
+    """
+    Union-find over the list of edges. Nodes in the same list in groups are 
+    also joined (used for noise vectors touching several nodes). Returns an
+    array giving each node the label 0, 1, ... of its component.
+    """
+    parent = list(range(n_nodes))
+    def find(x):
+        root = x
+        while parent[root] != root:
+            root = parent[root]
+        while parent[x] != root: # path compression
+            parent[x], x = root, parent[x]
+        return root
+    def union(x, y):
+        (x, y) = (find(x), find(y))
+        if x != y:
+            parent[max(x, y)] = min(x, y)
+    for (x, y) in np.asarray(edges, dtype=int).reshape(-1, 2).tolist():
+        union(x, y)
+    for group in groups:
+        group = list(group)
+        for y in group[1:]:
+            union(group[0], y)
+    roots = np.array([find(x) for x in range(n_nodes)], dtype=int)
+    labels = np.unique(roots, return_inverse=True)[1]
+    return labels.reshape(-1)
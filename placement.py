@@ -0,0 +1,155 @@
+"""
+      Searches over which nodes of a fixed network are coupled to noise,
+      for the placements which keep the largest decoherence free subspace.
+      Coupling another node to noise can only shrink W_df, so the best
+      dimension falls as more nodes are coupled; the search reports, for
+      each number of couplings, the largest dimension and every placement
+      reaching it, which is the Pareto set of couplings against dimension.
+
+      for size, Wdf_dim, placements in branch_and_bound(Q, size=3):
+          print(size, Wdf_dim, placements)
+
+      Placements sharing couplings share work: each candidate is found from
+      its parent placement with incremental_dfs.add_noise. As there, every
+      coupling in Q must be 1 with nothing on the diagonal; any other Q
+      raises ValueError before the search starts.
+"""
+
+# IMPORT MODULES ==============================================================
+import multiprocessing
+
+from batch import _attach, _shared, share
+from incremental import incremental_dfs
+
+#==============================================================================
+
+
+def greedy(Q, candidates=None, size=None, tol=1e-10):
+    """
+    Adds one node at a time, each time the candidate which leaves the
+    largest W_df (the lowest label on a tie). Returns a list of (size,
+    Wdf_dim, [placement]), one per number of couplings. Fast, but not
+    always optimal.
+    """
+    candidates, size = _defaults(Q, candidates, size)
+    state = incremental_dfs(Q, tol=tol)
+    chosen = []
+    frontier = []
+    for k in range(1, size + 1):
+        best = None
+        for node in candidates:
+            if node in chosen:
+                continue
+            child = state.copy()
+            child.add_noise(node)
+            if best is None or child.Wdf_dim > best[1].Wdf_dim:
+                best = (node, child)
+        if best is None:
+            break
+        chosen.append(best[0])
+        state = best[1]
+        frontier.append((k, state.Wdf_dim, [tuple(sorted(chosen))]))
+    return frontier
+
+
+def branch_and_bound(Q, candidates=None, size=None, min_dim=0, processes=None, tol=1e-10):
+    """
+    Every placement of up to size nodes from candidates (default every node)
+    reaching the largest W_df for its number of couplings, with W_df at
+    least min_dim. Returns a list of (size, Wdf_dim, placements) like
+    greedy, leaving out sizes where no placement reaches min_dim.
+
+    Placements are built up in increasing label order. As adding a node
+    never enlarges W_df, a branch is cut once its W_df is below min_dim,
+    or once it is below the best found for every larger size; greedy gives
+    the first bests. The subtrees under each first node are searched in parallel on
+    a process pool unless processes is 1.
+    """
+    candidates, size = _defaults(Q, candidates, size)
+    best = {k: (max(Wdf_dim, min_dim), []) for (k, Wdf_dim, p) in greedy(Q, candidates, size, tol)}
+    tasks = range(len(candidates))
+    if processes == 1 or len(candidates) < 2:
+        _shared.update(Q=Q, candidates=candidates, size=size, min_dim=min_dim, tol=tol,
+                       bounds=best)
+        found = [_search_from(first) for first in tasks]
+    else:
+        blocks, shared = share(Q)
+        try:
+            settings = dict(candidates=candidates, size=size, min_dim=min_dim, tol=tol,
+                            bounds=best)
+            with multiprocessing.Pool(processes, initializer=_attach,
+                                      initargs=(shared, None, settings)) as pool:
+                found = list(pool.imap_unordered(_search_from, tasks))
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+    for results in found:
+        _merge(best, results)
+    return [(k, best[k][0], sorted(best[k][1])) for k in sorted(best) if best[k][1]]
+
+
+def pareto(frontier):
+    """
+    Keeps the entries of a frontier (from greedy or branch_and_bound) which
+    no other entry beats on both more couplings and a larger W_df.
+    """
+    kept = []
+    for (k, Wdf_dim, placements) in frontier:
+        if not any(k2 >= k and d2 >= Wdf_dim and (k2, d2) != (k, Wdf_dim)
+                   for (k2, d2, p2) in frontier):
+            kept.append((k, Wdf_dim, placements))
+    return kept
+
+
+def _defaults(Q, candidates, size):
+    if candidates is None:
+        candidates = range(Q.shape[0])
+    candidates = sorted(set(int(c) for c in candidates))
+    if size is None:
+        size = len(candidates)
+    return candidates, min(size, len(candidates))
+
+
+def _merge(best, results):
+    """
+    Adds the placements in results to best, keeping only the largest W_df
+    for each size.
+    """
+    for k, (Wdf_dim, placements) in results.items():
+        if k not in best or Wdf_dim > best[k][0]:
+            best[k] = (Wdf_dim, list(placements))
+        elif Wdf_dim == best[k][0]:
+            best[k][1].extend(placements)
+
+
+def _search_from(first):
+    """
+    Searches every placement whose lowest node is candidates[first].
+    Returns {size: (Wdf_dim, placements)} with the bests it found.
+    """
+    candidates = _shared["candidates"]
+    best = {k: (Wdf_dim, []) for k, (Wdf_dim, p) in _shared["bounds"].items()}
+    state = incremental_dfs(_shared["Q"], tol=_shared["tol"])
+    state.add_noise(candidates[first])
+    _search(state, [candidates[first]], first + 1, best)
+    return {k: v for k, v in best.items() if v[1]}
+
+
+def _search(state, chosen, start, best):
+    k = len(chosen)
+    Wdf_dim = state.Wdf_dim
+    if Wdf_dim < _shared["min_dim"]:
+        return # and so is every placement containing this one
+    if Wdf_dim > best[k][0]:
+        best[k] = (Wdf_dim, [tuple(chosen)])
+    elif Wdf_dim == best[k][0]:
+        best[k][1].append(tuple(chosen))
+    size = _shared["size"]
+    if k == size or all(Wdf_dim < best[j][0] for j in range(k + 1, size + 1)):
+        return
+    candidates = _shared["candidates"]
+    for i in range(start, len(candidates)):
+        child = state.copy()
+        child.add_noise(candidates[i])
+        _search(child, chosen + [candidates[i]], i + 1, best)
@@ -0,0 +1,91 @@
+"""
+      Time evolution of the oscillator network, to check numerically that
+      states in W_df are never seen by the oscillators coupled to noise.
+      Amplitudes evolve as i d(psi)/dt = Q psi, so psi(t) = exp(-iQt) psi(0),
+      which is applied with scipy's expm_multiply (a Krylov/Taylor method)
+      and never formed as a dense matrix. Trajectories are yielded a chunk
+      of time points at a time, so they need not fit in memory.
+
+      Wdf_dim, W_df, subspaces = dfs(Q, V_0, verbose=False).solve("block")
+      print(verify(Q, V_0, W_df, np.linspace(0, 100, 1001)))
+"""
+
+# IMPORT MODULES ==============================================================
+import numpy as np
+
+#==============================================================================
+
+def evolve(Q, states, times, chunksize=64):
+    """
+    Yields (times, psi) for consecutive chunks of at most chunksize times,
+    where psi has shape (len(times), K, N): the K initial states (rows of
+    states, at t = 0) at each time. times must be increasing. Equally
+    spaced chunks are done in one expm_multiply call; otherwise each time
+    step is a separate call.
+    """
+    from scipy.sparse.linalg import expm_multiply
+    A = -1j*Q # works for dense arrays and scipy.sparse matrices alike
+    times = np.asarray(times, dtype=float).ravel()
+    psi = np.array(states, dtype=complex).reshape(-1, Q.shape[0]).T # columns
+    now = 0.0
+    for first in range(0, len(times), chunksize):
+        chunk = times[first:first + chunksize]
+        if chunk[0] != now:
+            psi = expm_multiply(A*(chunk[0] - now), psi)
+            now = chunk[0]
+        steps = np.diff(chunk)
+        if len(chunk) == 1:
+            values = psi[None]
+        elif np.allclose(steps, steps[0]):
+            values = expm_multiply(A, psi, start=0, stop=chunk[-1] - now,
+                                   num=len(chunk), endpoint=True)
+        else:
+            values = [psi]
+            for step in steps:
+                values.append(expm_multiply(A*step, values[-1]))
+            values = np.array(values)
+        psi = values[-1]
+        now = chunk[-1]
+        yield chunk, np.transpose(values, (0, 2, 1))
+
+
+def leakage(psi, V_0, W_df=None):
+    """
+    For states psi of shape (T, K, N), returns the amplitude seen by the
+    noise, |V_0 psi|, and (if W_df is given) the norm of the part of psi
+    outside W_df, each of shape (T, K). Both stay 0 for a state in W_df.
+    """
+    noise = np.linalg.norm(psi @ np.transpose(np.asarray(V_0, dtype=float)), axis=2)
+    if W_df is None:
+        return noise, None
+    W = np.asarray(W_df, dtype=float)
+    A, R = np.linalg.qr(np.transpose(W)) # orthonormal columns spanning W_df
+    outside = np.linalg.norm(psi - (psi @ A) @ np.transpose(A), axis=2)
+    return noise, outside
+
+
+def verify(Q, V_0, W_df, times, states=None, chunksize=64, tol=1e-8):
+    """
+    Evolves states (by default every vector of W_df) over times and returns
+    the largest noise amplitude and leakage out of W_df seen relative to the
+    initial norm, and whether both stayed below tol. times must not be
+    empty. With no W_df (None, as the engines return when Wdf_dim is 0)
+    states must be given and max_leakage is None.
+    """
+    if np.size(times) == 0:
+        raise ValueError("no times to evolve over, so nothing would be checked")
+    if states is None:
+        if W_df is None:
+            raise ValueError("there is no W_df, so the states to evolve must be given")
+        states = W_df
+    states = np.asarray(states, dtype=float).reshape(-1, Q.shape[0])
+    norms = np.maximum(np.linalg.norm(states, axis=1), np.finfo(float).tiny)
+    max_noise = 0.0
+    max_leakage = None if W_df is None else 0.0
+    for chunk, psi in evolve(Q, states, times, chunksize):
+        noise, outside = leakage(psi, V_0, W_df)
+        max_noise = max(max_noise, float(np.max(noise/norms)))
+        if outside is not None:
+            max_leakage = max(max_leakage, float(np.max(outside/norms)))
+    return {"max_noise": max_noise, "max_leakage": max_leakage,
+            "decoherence_free": max_noise < tol and (max_leakage or 0.0) < tol}
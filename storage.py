@@ -0,0 +1,137 @@
+"""
+      Saves networks and their results (Q, V_0, the subspaces affected by
+      noise, W_df, Wdf_dim and any metadata about the run) in a directory,
+      so they can be reused and shared instead of recomputed. Arrays are
+      appended to one binary file, data.bin, each starting on a 64 byte
+      boundary, and described by one JSON line per result in index.jsonl.
+      Q is stored in CSR form and bases as contiguous float64 rows, so they
+      are read back through memory maps and only the rows that are used
+      are loaded.
+
+      store = result_store("results")
+      store.append(Q, V_0, *dfs(Q, V_0, verbose=False).solve("block"))
+      W_df = store[0]["W_df"][:10] # reads only the first ten vectors
+"""
+
+# IMPORT MODULES ==============================================================
+import json
+import os
+import time
+import numpy as np
+
+#==============================================================================
+
+ALIGN = 64 # bytes
+
+
+class result_store:
+    """
+    Append-only store of results in directory, which is made if needed.
+    len(store) is the number of results and store[i] is the i'th, as a dict
+    with Q (CSR), V_0, subspaces, W_df (None when there is none), Wdf_dim
+    and metadata. Arrays are read-only memory maps.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.data_path = os.path.join(directory, "data.bin")
+        self.index_path = os.path.join(directory, "index.jsonl")
+        self.records = []
+        if os.path.exists(self.index_path):
+            with open(self.index_path) as file:
+                self.records = [json.loads(line) for line in file if line.strip()]
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, i):
+        record = self.records[i]
+        arrays = {name: self.read(entry) for name, entry in record["arrays"].items()}
+        from scipy import sparse
+        Q = sparse.csr_matrix((arrays["Q.data"], arrays["Q.indices"], arrays["Q.indptr"]),
+                              shape=tuple(record["Q.shape"]), copy=False)
+        return {"Q": Q, "V_0": arrays["V_0"], "subspaces": arrays["subspaces"],
+                "W_df": arrays.get("W_df"), "Wdf_dim": record["Wdf_dim"],
+                "metadata": record["metadata"]}
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def read(self, entry):
+        """
+        Memory map of one stored array, from its (offset, shape, dtype).
+        """
+        offset, shape, dtype = entry
+        if int(np.prod(shape)) == 0: # np.memmap cannot map nothing
+            return np.zeros(shape, dtype=np.dtype(dtype))
+        return np.memmap(self.data_path, dtype=np.dtype(dtype), mode="r",
+                         offset=offset, shape=tuple(shape))
+
+    def write(self, file, array):
+        """
+        Appends array to the open data file, padded to start on an ALIGN
+        byte boundary. Returns its (offset, shape, dtype).
+        """
+        array = np.ascontiguousarray(array)
+        offset = file.tell()
+        padding = -offset % ALIGN
+        file.write(b"\0"*padding)
+        file.write(array.tobytes())
+        return [offset + padding, list(array.shape), array.dtype.str]
+
+    def write_Q(self, file, Q):
+        """
+        Stores Q in CSR form, returning its array entries and shape.
+        """
+        from scipy import sparse
+        Q = sparse.csr_matrix(Q)
+        entries = {"Q.data": self.write(file, Q.data.astype(np.float64)),
+                   "Q.indices": self.write(file, Q.indices),
+                   "Q.indptr": self.write(file, Q.indptr)}
+        return entries, list(Q.shape)
+
+    def append(self, Q, V_0, Wdf_dim, W_df, subspaces, metadata=None, stored_Q=None):
+        """
+        Adds one result, as returned by dfs.solve, and returns its index.
+        Exact bases are stored as float64. stored_Q, from an earlier record's
+        arrays, reuses a Q already in the file instead of writing it again.
+        """
+        N = Q.shape[0]
+        with open(self.data_path, "ab") as file:
+            if stored_Q is None:
+                arrays, shape = self.write_Q(file, Q)
+            else:
+                arrays, shape = stored_Q
+            arrays = dict(arrays)
+            arrays["V_0"] = self.write(file, np.asarray(V_0, dtype=float).reshape(-1, N))
+            arrays["subspaces"] = self.write(file, np.asarray(subspaces, dtype=float).reshape(-1, N))
+            if W_df is not None:
+                arrays["W_df"] = self.write(file, np.asarray(W_df, dtype=float).reshape(-1, N))
+        record = {"Wdf_dim": int(Wdf_dim), "Q.shape": shape, "arrays": arrays,
+                  "metadata": dict(metadata or {}, saved=time.time())}
+        with open(self.index_path, "a") as file:
+            file.write(json.dumps(record) + "\n")
+        self.records.append(record)
+        return len(self.records) - 1
+
+    def extend(self, results, networks, Q=None, metadata=None):
+        """
+        Adds the results of batch.run_batch (or sweeps giving the same
+        (index, Wdf_dim, W_df, subspaces) tuples) for networks, the list
+        given to it. When the networks share Q, pass it and it is written
+        only once. Returns the indices of the new records.
+        """
+        added = []
+        stored_Q = None
+        if Q is not None:
+            with open(self.data_path, "ab") as file:
+                stored_Q = self.write_Q(file, Q)
+        for (index, Wdf_dim, W_df, subspaces) in results:
+            if Q is None:
+                network_Q, V_0 = networks[index]
+            else:
+                network_Q, V_0 = Q, networks[index]
+            info = dict(metadata or {}, batch_index=int(index))
+            added.append(self.append(network_Q, V_0, Wdf_dim, W_df, subspaces, info, stored_Q))
+        return added
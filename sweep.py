@@ -0,0 +1,150 @@
+"""
+      Parameter sweeps: how the decoherence free subspace of one network
+      changes with the coupling strengths and the oscillator frequencies.
+      Every parameter point gives a Q, and the whole stack of them is
+      propagated at once with batched (3D array) linear algebra instead of
+      making one dfs object per point.
+
+      weights = np.linspace(0.5, 2, 100)
+      Wdf_dims = sweep(edges, [0], weights)
+"""
+
+# IMPORT MODULES ==============================================================
+import numpy as np
+
+from dfs import eigenspace_split
+from network_to_matrix import edges_to_matrix
+
+#==============================================================================
+
+def grid(weights, frequencies):
+    """
+    Every combination of a list of weights and a list of frequencies, as
+    two arrays of len(weights)*len(frequencies) points to pass to sweep.
+    Each entry may be a scalar or an array (per coupling or per node).
+    """
+    weights = np.asarray(weights, dtype=float)
+    frequencies = np.asarray(frequencies, dtype=float)
+    W = len(weights)
+    F = len(frequencies)
+    return (np.repeat(weights, F, axis=0),
+            np.tile(frequencies, (W,) + (1,)*(frequencies.ndim - 1)))
+
+
+def coupling_stack(edges, n_nodes, weights, frequencies=None):
+    """
+    Stack of P matrices Q, shape (P, N, N), for one topology. weights has
+    shape (P,) (one strength for every coupling) or (P, E) (one per edge,
+    in the order of edges; a coupling listed twice has its last weight).
+    frequencies, the diagonal of Q, has shape (P,) or (P, N); None leaves
+    the diagonal at 0 as in network.build_matrix.
+    """
+    edges = np.asarray(edges, dtype=int).reshape(-1, 2)
+    keep = np.nonzero(edges[:, 0] != edges[:, 1])[0] # a node is not coupled to itself
+    pairs = np.sort(edges[keep], axis=1)
+    # the last time each coupling is listed, as numpy does not say which of
+    # repeated indices an assignment keeps
+    first = np.unique(pairs[::-1], axis=0, return_index=True)[1]
+    last = np.sort(len(pairs) - 1 - first)
+    edges = pairs[last]
+    weights = np.asarray(weights, dtype=float)
+    if weights.ndim == 1:
+        weights = np.repeat(weights[:, None], len(edges), axis=1)
+    else:
+        weights = weights[:, keep[last]]
+    P = len(weights)
+    Qs = np.zeros((P, n_nodes, n_nodes))
+    Qs[:, edges[:, 0], edges[:, 1]] = weights
+    Qs[:, edges[:, 1], edges[:, 0]] = weights
+    if frequencies is not None:
+        frequencies = np.broadcast_to(np.asarray(frequencies, dtype=float).reshape(P, -1),
+                                      (P, n_nodes))
+        nodes = np.arange(n_nodes)
+        Qs[:, nodes, nodes] = frequencies
+    return Qs
+
+
+def krylov_dimensions(Qs, V_0, tol=1e-10, bases=False):
+    """
+    Block propagation (see dfs.block_propagation) for a stack of matrices
+    Qs, shape (P, N, N), sharing the noise couplings V_0. Returns the
+    dimension of W_df for each point. Each sweep is one batched matrix
+    product, two passes of batched Gram-Schmidt against the subspaces found
+    so far and a batched SVD, whose singular values give the rank of the
+    new block at every point. As in dfs.reached, the invariant span found
+    at each point is then cut down to the part V_0 reaches, from one
+    batched eigendecomposition of Q restricted to each span. With
+    bases=True, also returns a list of (W_df, subspaces) for each point,
+    with vectors as rows.
+    """
+    Qs = np.asarray(Qs, dtype=float)
+    P, N = Qs.shape[:2]
+    V_0 = np.array(V_0, dtype=float).reshape(-1, N)
+    scale = np.maximum(np.linalg.norm(Qs, axis=(1, 2)), 1.0)[:, None]
+    basis = np.zeros((P, N, N)) # columns are subspaces, zero once unused
+    count = np.zeros(P, dtype=int)
+    block = np.broadcast_to(np.transpose(V_0), (P, N, len(V_0)))
+    block_scale = np.ones((P, 1)) # V_0 is compared to 1, like dfs
+    while block.shape[2] > 0:
+        for sweep in range(2): # second pass restores orthogonality
+            block = block - basis @ (np.transpose(basis, (0, 2, 1)) @ block)
+        U, s, Vt = np.linalg.svd(block, full_matrices=False)
+        accepted = s > tol*block_scale # sorted, so the accepted come first
+        ps, js = np.nonzero(accepted)
+        if len(ps) == 0:
+            break
+        basis[ps, :, count[ps] + js] = U[ps, :, js]
+        count += accepted.sum(axis=1)
+        width = int(accepted.sum(axis=1).max())
+        block = Qs @ (U[:, :, :width]*accepted[:, None, :width])
+        block_scale = scale
+    width = int(count.max(initial=0))
+    K = basis[:, :, :width] # unused columns are 0, and so are their rows of T
+    T = np.transpose(K, (0, 2, 1)) @ (Qs @ K)
+    values, vectors = np.linalg.eigh((T + np.transpose(T, (0, 2, 1)))/2)
+    C = V_0 @ K
+    Wdf_dims = np.zeros(P, dtype=int)
+    results = []
+    for p in range(P):
+        affected, free = eigenspace_split(values[p], vectors[p], C[p])
+        Wdf_dims[p] = N - len(affected)
+        if bases:
+            subspaces = affected @ np.transpose(K[p])
+            U, s, Vt = np.linalg.svd(subspaces.reshape(-1, N), full_matrices=True)
+            results.append((Vt[len(subspaces):], subspaces))
+    if bases == False:
+        return Wdf_dims
+    return Wdf_dims, results
+
+
+def sweep(edges, noise, weights, frequencies=None, n_nodes=None, tol=1e-10, bases=False,
+          chunksize=256):
+    """
+    Dimension of W_df of the network given by edges and noise (as for
+    analysis.analyse) at every parameter point; see coupling_stack for the
+    shapes of weights and frequencies and grid for sweeping both. Points
+    are solved chunksize at a time to bound the memory used by the stack.
+    """
+    Q, V_0 = edges_to_matrix(edges, noise, n_nodes)
+    N = Q.shape[0]
+    weights = np.asarray(weights, dtype=float)
+    P = len(weights)
+    if frequencies is not None:
+        frequencies = np.broadcast_to(np.asarray(frequencies, dtype=float).reshape(P, -1),
+                                      (P, N))
+    Wdf_dims = []
+    results = []
+    for first in range(0, P, chunksize):
+        chunk = slice(first, first + chunksize)
+        Qs = coupling_stack(edges, N, weights[chunk],
+                            None if frequencies is None else frequencies[chunk])
+        found = krylov_dimensions(Qs, V_0, tol, bases)
+        if bases:
+            Wdf_dims.append(found[0])
+            results.extend(found[1])
+        else:
+            Wdf_dims.append(found)
+    Wdf_dims = np.concatenate(Wdf_dims) if Wdf_dims else np.zeros(0, dtype=int)
+    if bases:
+        return Wdf_dims, results
+    return Wdf_dims
@@ -0,0 +1,229 @@
+"""
+      Symmetry reduction before propagation. Colour refinement splits the
+      nodes into the coarsest equitable partition which keeps every noise
+      coupling: nodes in a cell have the same total coupling to each cell,
+      and each row of V_0 is constant on every cell. Rings, lattices and
+      stars have many nodes in each cell.
+
+      With P the N x c matrix of the cells (P[i, c] = 1 when node i is in
+      cell c), QP = PB for the c x c quotient matrix B, and V_0 = A P^T.
+      So the span of V_0, QV_0, ... is P times the span of A, BA, ..., which
+      is found by running an engine on (B, A) alone. The decoherence free
+      subspace is the rest of col(P), plus every vector which sums to zero
+      on each cell.
+
+      cache.py uses the same colour refinement to label networks
+      canonically.
+"""
+
+# IMPORT MODULES ==============================================================
+import time
+import numpy as np
+
+from dfs import dfs
+
+#==============================================================================
+
+def _mix(x):
+    """
+    splitmix64 finaliser, scrambles uint64 values elementwise.
+    """
+    x = np.asarray(x, dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        x = (x ^ (x >> np.uint64(30))) * np.uint64(0xbf58476d1ce4e5b9)
+        x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94d049bb133111eb)
+        x = x ^ (x >> np.uint64(31))
+    return x
+
+
+def couplings(Q):
+    """
+    Pairs (i, j), i < j, of coupled nodes in a dense or sparse Q, with the
+    strength of each coupling.
+    """
+    if hasattr(Q, "tocoo"):
+        Q = Q.tocoo()
+        (rows, cols, values) = (Q.row, Q.col, Q.data)
+        keep = (rows < cols) & (values != 0)
+    else:
+        Q = np.asarray(Q)
+        (rows, cols) = np.nonzero(Q)
+        values = Q[rows, cols]
+        keep = rows < cols
+    edges = np.column_stack([rows[keep], cols[keep]]).astype(int)
+    return edges, np.asarray(values[keep], dtype=float)
+
+
+def dense_rank(values):
+    """
+    Replaces values by their position in the sorted list of distinct values.
+    """
+    return np.unique(values, return_inverse=True)[1].reshape(-1)
+
+
+def _weight_bits(weights):
+    return np.asarray(weights, dtype=np.float64).view(np.uint64)
+
+
+def refine(colours, rows, cols, weights):
+    """
+    Colour refinement: each node's colour is combined with the colours of
+    its neighbours (and the coupling to each) until no colour class splits.
+    Nothing depends on how the nodes are labelled, so relabelled networks
+    end up with the same colours.
+    """
+    edge_bits = _mix(_weight_bits(weights))
+    count = len(np.unique(colours))
+    while True:
+        with np.errstate(over="ignore"):
+            messages = _mix(colours[cols].astype(np.uint64) * np.uint64(0x9e3779b97f4a7c15) + edge_bits)
+            total = np.zeros(len(colours), dtype=np.uint64)
+            np.add.at(total, rows, messages)
+            colours = dense_rank(_mix(colours.astype(np.uint64) + _mix(total)))
+        new_count = len(np.unique(colours))
+        if new_count == count:
+            return colours
+        count = new_count
+
+
+def neighbours(Q):
+    """
+    Both directions of every coupling, as rows, cols and weights.
+    """
+    edges, weights = couplings(Q)
+    rows = np.concatenate([edges[:, 0], edges[:, 1]])
+    cols = np.concatenate([edges[:, 1], edges[:, 0]])
+    return rows, cols, np.concatenate([weights, weights])
+
+
+def equitable_colours(Q, V_0, sort_noise=True):
+    """
+    Colour refinement of (Q, V_0), starting from the diagonal of Q and each
+    node's entries in V_0. The colour classes are the coarsest equitable 
+    partition which separates those: every node of a class has the same 
+    total coupling to each class. With sort_noise=False every row of V_0
+    is also constant on each class; by default the rows may come in any
+    order, so only the set of a node's entries is compared.
+    """
+    N = Q.shape[0]
+    diagonal = np.asarray(Q.diagonal(), dtype=float).reshape(-1)
+    noise = np.asarray(V_0, dtype=float).reshape(-1, N)
+    if sort_noise:
+        noise = np.sort(noise, axis=0) # noise vectors may come in any order
+    start = np.zeros(N, dtype=np.uint64)
+    for column in [diagonal] + list(noise):
+        start = _mix(start + _mix(_weight_bits(column)))
+    return refine(dense_rank(start), *neighbours(Q))
+
+
+def quotient(Q, V_0, tol=1e-10):
+    """
+    Returns cells (the cell of each node), the quotient matrix B (dense, or
+    CSR for a sparse Q) and A, the values of each noise vector on each cell.
+    Raises ValueError if the partition is not equitable, which would only
+    happen if two colours had the same hash.
+    """
+    from scipy import sparse
+    N = Q.shape[0]
+    V_0 = np.asarray(V_0, dtype=float).reshape(-1, N)
+    cells = equitable_colours(Q, V_0, sort_noise=False)
+    c = int(cells.max(initial=-1)) + 1
+    first = np.zeros(c, dtype=int)
+    first[cells[::-1]] = np.arange(N)[::-1] # lowest node of each cell
+    P = sparse.csr_matrix((np.ones(N), (np.arange(N), cells)), shape=(N, c))
+    QP = sparse.csr_matrix(Q @ P)
+    B = QP[first]
+    error = abs(QP - P @ B).max() if N > 0 else 0
+    if error > tol*max(abs(QP).max() if N > 0 else 0, 1.0):
+        raise ValueError("the colour classes are not an equitable partition")
+    if not hasattr(Q, "tocsr"):
+        B = B.toarray()
+    return cells, B, V_0[:, first]
+
+
+def cell_differences(cells):
+    """
+    Orthonormal vectors which sum to zero on every cell, as rows: for a cell
+    with nodes n_0, ..., n_m, the k'th is (e_n_0 + ... + e_n_k-1 - k e_n_k)
+    normalised (the Helmert basis).
+    """
+    N = len(cells)
+    order = np.argsort(cells, kind="stable")
+    starts = np.searchsorted(cells[order], np.arange(cells.max(initial=-1) + 2))
+    rows = []
+    for c in range(len(starts) - 1):
+        nodes = order[starts[c]:starts[c + 1]]
+        m = len(nodes)
+        if m < 2:
+            continue
+        k = np.arange(1, m)
+        H = np.tri(m - 1, m)
+        H[k - 1, k] = -k
+        H /= np.sqrt(k*(k + 1))[:, None]
+        block = np.zeros((m - 1, N))
+        block[:, nodes] = H
+        rows.append(block)
+    if not rows:
+        return np.zeros((0, N))
+    return np.vstack(rows)
+
+
+def symmetric_propagation(Q, V_0, engine="spectral", hooks=None, tol=1e-10):
+    """
+    Returns Wdf_dim, W_df and the subspaces affected by noise, like
+    dfs.solve(engine), from the quotient network. engine is any of
+    dfs.ENGINES; an exact engine gives exact subspaces. W_df is always an
+    orthonormal float basis, and float subspaces are orthonormalised.
+
+    "certified" cannot check the quotient, as B is not symmetric when the
+    cells have different sizes. Instead the spectral result is lifted and
+    certified against the whole of Q, falling back to "exact" on the
+    quotient, and both bases are exact as from dfs.certified_propagation.
+    """
+    if engine == "certified":
+        from certify import certified
+        float_result = symmetric_propagation(Q, V_0, "spectral", None, tol)
+        start = time.perf_counter()
+        result = certified(Q, V_0, float_result[1], float_result[2])
+        for hook in hooks or []:
+            hook("certificate", {"passed": result is not None,
+                                 "seconds": time.perf_counter() - start})
+        if result is not None:
+            return result
+        engine = "exact"
+    N = Q.shape[0]
+    cells, B, A = quotient(Q, V_0, tol)
+    sizes = np.bincount(cells, minlength=B.shape[0]).astype(float)
+    root = np.sqrt(sizes)
+    if engine == "exact": # needs the integer B
+        # only the span of A, BA, ... is used, which symmetry does not
+        # affect; the engine's W_df for B is not
+        Wdf_q, W_q, Z = dfs(B, A, verbose=False, hooks=hooks).solve(engine)
+        Y = Z
+    else:
+        # the float engines need a symmetric matrix: use the orthonormal
+        # cells P D^-1/2, where B becomes D^1/2 B D^-1/2
+        B = B.multiply(root[:, None]/root[None, :]).tocsr() if hasattr(B, "tocsr") \
+            else B*root[:, None]/root[None, :]
+        Wdf_q, W_q, Z = dfs(B, A*root, verbose=False, hooks=hooks).solve(engine)
+        Y = np.asarray(Z, dtype=float).reshape(len(Z), len(sizes))/root
+    r = len(Y)
+    if hasattr(Y, "numerators"): # exact basis, lifting is exact too
+        from exact import basis
+        subspaces = basis(Y.numerators[:, cells], Y.denominators.copy())
+    else:
+        Y = np.asarray(Y, dtype=float).reshape(r, len(sizes))
+        subspaces = np.transpose(np.linalg.qr(np.transpose(Y[:, cells]))[0]) if r else \
+            np.zeros((0, N))
+    Wdf_dim = N - r
+    if Wdf_dim == 0:
+        return 0, None, subspaces
+    # the rest of col(P), in the orthonormal coordinates of P D^-1/2
+    Yh = np.asarray(Y, dtype=float).reshape(r, len(sizes))*root
+    if r:
+        U, s, Vt = np.linalg.svd(Yh, full_matrices=True)
+        rest = Vt[r:]
+    else:
+        rest = np.eye(len(sizes))
+    W_df = np.vstack([(rest/root)[:, cells], cell_differences(cells)])
+    return Wdf_dim, W_df, subspaces
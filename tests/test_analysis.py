@@ -0,0 +1,67 @@
+"""
+      analyse and the command line must give the engines' results, with
+      only the result on stdout.
+"""
+
+import json
+
+import numpy as np
+import pytest
+
+import analysis
+import generators
+from dfs import dfs
+
+
+STAR = [(0, 1), (0, 2), (0, 3), (0, 4)] # W_df has dimension 3 with noise at 0
+
+
+def run(capsys, *argv):
+    assert analysis.main([str(arg) for arg in argv]) == 0
+    return capsys.readouterr()
+
+
+@pytest.fixture
+def star_file(tmp_path):
+    path = tmp_path/"star.txt"
+    path.write_text("".join("%d %d\n"%edge for edge in STAR) + "noise 0\n")
+    return path
+
+
+def test_analyse():
+    Wdf_dim, W_df, subspaces = analysis.analyse(STAR, [0])
+    assert Wdf_dim == 3
+    assert np.allclose(W_df @ np.transpose(subspaces), 0)
+    Q, V_0 = generators.random_sparse(27, degree=2, seed=5)
+    edges = np.transpose(np.nonzero(np.triu(Q)))
+    assert analysis.analyse(edges, [0], n_nodes=27)[0] == \
+        dfs(Q, V_0, verbose=False).solve("exact")[0]
+
+
+@pytest.mark.parametrize("engine", ["spectral", "block", "exact", "certified", "symmetric"])
+def test_json(capsys, star_file, engine):
+    result = json.loads(run(capsys, star_file, "--json", "--engine", engine).out)
+    assert result["Wdf_dim"] == 3
+    assert np.array(result["W_df"]).shape == (3, 5)
+    assert np.array(result["subspaces"]).shape == (2, 5)
+
+
+def test_dimension_only(capsys, star_file):
+    assert json.loads(run(capsys, star_file, "--dimension-only", "--json").out) == {"Wdf_dim": 3}
+    assert run(capsys, star_file, "--dimension-only").out == \
+        "The decoherence free subspace has dimension 3.\n"
+    # more noise: the leaves then only keep the differences of 3 and 4
+    assert "dimension 1." in run(capsys, star_file, "--dimension-only", "--noise", 1, 2).out
+
+
+def test_verbose(capsys, star_file, tmp_path):
+    output = run(capsys, star_file, "--verbose", "--json")
+    assert json.loads(output.out)["Wdf_dim"] == 3
+    assert "dimension 3" in output.err
+    output = run(capsys, star_file, "--verbose")
+    assert output.out == ""
+    assert output.err.count("dimension 3") == 1
+    path = tmp_path/"no_noise.txt"
+    path.write_text("0 1\n1 2\n")
+    for engine in ("propagation", "block", "spectral", "symmetric"):
+        assert "dimension 3" in run(capsys, path, "--verbose", "--engine", engine).err
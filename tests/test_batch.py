@@ -0,0 +1,72 @@
+"""
+      run_batch must tag every result with the index of its network, give
+      the same results as solving each network alone, and release the
+      shared memory holding a common Q.
+"""
+
+from multiprocessing import shared_memory
+
+import numpy as np
+import pytest
+
+import batch
+import generators
+from dfs import dfs
+
+
+def expected(Q, V_0):
+    return dfs(Q, V_0, verbose=False).solve("spectral")[0]
+
+
+def test_results_are_tagged():
+    networks = [generators.ring(n) for n in range(3, 9)]
+    networks += [generators.star(6), generators.chain(4)]
+    results = list(batch.run_batch(networks, processes=2))
+    assert sorted(index for index, *result in results) == list(range(len(networks)))
+    for index, Wdf_dim, W_df, subspaces in results:
+        assert Wdf_dim == expected(*networks[index])
+        N = networks[index][0].shape[0]
+        assert subspaces.shape == (N - Wdf_dim, N)
+
+
+@pytest.fixture
+def blocks(monkeypatch):
+    """
+    The names of the shared memory blocks made by run_batch.
+    """
+    names = []
+    share = batch.share
+    def recording(Q):
+        made, description = share(Q)
+        names.extend(block.name for block in made)
+        return made, description
+    monkeypatch.setattr(batch, "share", recording)
+    return names
+
+
+def released(names):
+    for name in names:
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name=name)
+    return True
+
+
+@pytest.mark.parametrize("sparse", [False, True])
+def test_shared_Q(blocks, sparse):
+    Q, V_0 = generators.random_sparse(16, degree=2, sparse=sparse, seed=0)
+    noise = [np.eye(16)[[node]] for node in (0, 1, 5, 6)] + [np.eye(16)[[0, 15]]]
+    results = dict((index, result) for index, *result in
+                   batch.run_batch(noise, Q=Q, processes=2, chunksize=2))
+    assert sorted(results) == list(range(len(noise)))
+    for index, (Wdf_dim, W_df, subspaces) in results.items():
+        assert Wdf_dim == expected(Q, noise[index])
+    assert len(blocks) == (3 if sparse else 1)
+    assert released(blocks)
+
+
+def test_released_when_stopped_early(blocks):
+    Q, V_0 = generators.ring(10)
+    results = batch.run_batch([V_0]*6, Q=Q, processes=2)
+    next(results)
+    results.close()
+    assert len(blocks) == 1 and released(blocks)
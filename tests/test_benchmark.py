@@ -0,0 +1,47 @@
+"""
+      The benchmark must flag (or, strict, refuse) an engine whose Wdf_dim
+      differs from the others for the same network and size.
+"""
+
+import json
+import pytest
+
+import benchmark
+
+
+def wrong_block(run_stages):
+    """
+    run_stages, but the block engine is one off.
+    """
+    def run(Q, V_0, engine, repeat, memory):
+        times, peaks, Wdf_dim = run_stages(Q, V_0, engine, repeat, memory)
+        return times, peaks, Wdf_dim + (engine == "block")
+    return run
+
+
+def test_engines_agree():
+    records = list(benchmark.benchmark(["lattice2d", "ring"], [16, 100], ["block", "spectral"],
+                                       repeat=1, memory=False))
+    assert records and all(r["agrees"] for r in records)
+
+
+def test_disagreement_flagged(monkeypatch, tmp_path):
+    monkeypatch.setattr(benchmark, "run_stages", wrong_block(benchmark.run_stages))
+    records = list(benchmark.benchmark(["ring"], [16], ["spectral", "block"],
+                                       repeat=1, memory=False))
+    assert {r["engine"] for r in records if not r["agrees"]} == {"block"}
+    with pytest.raises(ValueError, match="block"):
+        list(benchmark.benchmark(["ring"], [16], ["spectral", "block"], repeat=1,
+                                 memory=False, strict=True))
+    output = tmp_path/"results.jsonl"
+    assert benchmark.main(["--networks", "ring", "--sizes", "16", "--engines", "block",
+                           "--repeat", "1", "--no-memory", "--output", str(output)]) == 1
+    assert all(not json.loads(line)["agrees"] for line in output.read_text().splitlines())
+
+
+def test_no_reference(monkeypatch):
+    monkeypatch.setattr(benchmark, "reference", lambda Q, V_0: None)
+    monkeypatch.setattr(benchmark, "run_stages", wrong_block(benchmark.run_stages))
+    records = list(benchmark.benchmark(["ring"], [16], ["spectral", "block"],
+                                       repeat=1, memory=False))
+    assert {r["engine"] for r in records if not r["agrees"]} == {"block"}
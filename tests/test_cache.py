@@ -0,0 +1,58 @@
+"""
+      result_cache must find a network again however its nodes are
+      labelled, in memory or on disk, and return the result in the
+      caller's labels.
+"""
+
+import numpy as np
+
+import generators
+from cache import result_cache
+from dfs import dfs
+
+
+def relabel(Q, V_0, seed):
+    permutation = np.random.default_rng(seed).permutation(Q.shape[0])
+    return Q[np.ix_(permutation, permutation)], V_0[:, permutation]
+
+
+def projector(W):
+    A = np.linalg.qr(np.transpose(W))[0]
+    return A @ np.transpose(A)
+
+
+def test_relabelled_hit():
+    Q, V_0 = generators.random_sparse(30, degree=2, noise=(0, 4), seed=3)
+    cache = result_cache()
+    cache.propagation(Q, V_0, engine="spectral")
+    for seed in range(3):
+        P, U_0 = relabel(Q, V_0, seed)
+        Wdf_dim, W_df, subspaces = cache.propagation(P, U_0, engine="spectral")
+        expected = dfs(P, U_0, verbose=False).solve("spectral")
+        assert Wdf_dim == expected[0] > 0
+        assert np.allclose(projector(W_df), projector(expected[1]), atol=1e-8)
+        assert np.allclose(projector(subspaces), projector(expected[2]), atol=1e-8)
+    assert (cache.hits, cache.misses) == (3, 1)
+
+
+def test_lru_eviction():
+    cache = result_cache(maxsize=2)
+    rings = [generators.ring(n) for n in (5, 6, 7)]
+    for Q, V_0 in rings:
+        cache.propagation(Q, V_0, engine="spectral")
+    assert len(cache.memory) == 2
+    cache.propagation(*rings[2], engine="spectral") # most recent, still kept
+    cache.propagation(*rings[0], engine="spectral") # least recent, evicted
+    assert (cache.hits, cache.misses) == (1, 4)
+
+
+def test_disk_hit(tmp_path):
+    Q, V_0 = generators.lattice((4, 5), noise=(3,))
+    first = result_cache(directory=str(tmp_path))
+    expected = first.propagation(Q, V_0, engine="spectral")
+    cache = result_cache(directory=str(tmp_path))
+    P, U_0 = relabel(Q, V_0, 0)
+    Wdf_dim, W_df, subspaces = cache.propagation(P, U_0, engine="spectral")
+    assert (cache.hits, cache.misses) == (1, 0)
+    assert Wdf_dim == expected[0]
+    assert np.allclose(projector(W_df), projector(dfs(P, U_0, verbose=False).solve("spectral")[1]))
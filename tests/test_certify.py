@@ -0,0 +1,40 @@
+"""
+      The certified engine must pass its check on the lattices the float
+      engines used to get wrong, and fall back to the exact engine when
+      the check fails.
+"""
+
+import numpy as np
+import pytest
+
+import generators
+from dfs import dfs
+
+
+def certificates(Q, V_0, **options):
+    events = []
+    hook = lambda event, data: events.append(data["passed"]) if event == "certificate" else None
+    result = dfs(Q, V_0, verbose=False, hooks=[hook]).certified_propagation(**options)
+    return result, events
+
+
+@pytest.mark.parametrize("shape, sparse", [((10, 10), True), ((20, 20), False)])
+def test_lattices_pass(shape, sparse):
+    Q, V_0 = generators.lattice(shape, sparse=sparse)
+    (Wdf_dim, W_df, subspaces), events = certificates(Q, V_0)
+    assert events == [True]
+    assert Wdf_dim == dfs(Q, V_0, verbose=False).modular_dimension()
+    V = np.asarray(V_0, dtype=int).astype(object)
+    assert not np.any(V @ np.transpose(W_df.numerators)) # exactly orthogonal
+
+
+def test_fallback_matches_exact():
+    # W_df is spanned by (0, 1, -2), whose echelon form needs a half
+    Q = np.array([[0, 2, 1], [2, 0, 0], [1, 0, 0]])
+    V_0 = np.array([[1, 0, 0]])
+    expected = dfs(Q, V_0, verbose=False).solve("exact")
+    (Wdf_dim, W_df, subspaces), events = certificates(Q, V_0, max_denominator=1)
+    assert events == [False]
+    assert Wdf_dim == expected[0]
+    assert np.array_equal(subspaces.numerators, expected[2].numerators)
+    assert certificates(Q, V_0)[1] == [True]
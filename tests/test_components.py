@@ -0,0 +1,38 @@
+"""
+      Solving each connected component alone must give the same W_df as
+      solving the whole network.
+"""
+
+import numpy as np
+from scipy import sparse
+
+import generators
+from components import solve_by_components
+from dfs import dfs
+
+
+def disjoint(*networks):
+    """
+    One network made of several, with their noise couplings.
+    """
+    Q = sparse.block_diag([sparse.csr_matrix(Q) for Q, V_0 in networks]).tocsr()
+    V_0 = sparse.block_diag([sparse.csr_matrix(V_0) for Q, V_0 in networks]).toarray()
+    return Q, V_0[np.any(V_0 != 0, axis=1)]
+
+
+def test_lattice_matches_modular():
+    Q, V_0 = generators.lattice((10, 10))
+    expected = dfs(Q, V_0, verbose=False).modular_dimension()
+    assert solve_by_components(Q, V_0, processes=1)[0] == expected
+
+
+def test_components_match_exact():
+    Q, V_0 = disjoint(generators.lattice((4, 4)), generators.ring(7),
+                      generators.star(5, noise=(1,)), (np.zeros((3, 3)), np.zeros((0, 3))))
+    expected = dfs(Q.toarray(), V_0, verbose=False).solve("exact")
+    for processes in (1, 2):
+        Wdf_dim, W_df, subspaces = solve_by_components(Q, V_0, processes=processes)
+        assert Wdf_dim == expected[0]
+        both = np.vstack([subspaces, np.asarray(expected[2], dtype=float)])
+        assert np.linalg.matrix_rank(subspaces) == np.linalg.matrix_rank(both)
+        assert np.allclose(W_df @ np.transpose(subspaces), 0)
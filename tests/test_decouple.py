@@ -0,0 +1,52 @@
+"""
+      decouple_system must give the two diagonal blocks of Q in the basis of
+      the subspaces affected by noise followed by W_df.
+"""
+
+import numpy as np
+import pytest
+
+import generators
+from dfs import dfs
+
+
+def orthonormal(rows):
+    return np.linalg.qr(np.transpose(np.asarray(rows, dtype=float)))[0]
+
+
+@pytest.mark.parametrize("network, engine", [(generators.star(6), "spectral"),
+                                             (generators.lattice((4, 5), sparse=True), "block"),
+                                             (generators.ring(8, noise=(0, 2)), "exact")])
+def test_blocks_reproduce_Q(network, engine):
+    Q, V_0 = network
+    N = Q.shape[0]
+    solver = dfs(Q, V_0, verbose=False)
+    Wdf_dim, W_df, subspaces = solver.solve(engine)
+    assert Wdf_dim > 0
+    affected, free = solver.decouple_system(subspaces, W_df, N)
+    assert affected.shape == (N - Wdf_dim,)*2 and free.shape == (Wdf_dim,)*2
+    A = orthonormal(subspaces)
+    B = orthonormal(W_df)
+    dense = Q.toarray() if hasattr(Q, "toarray") else Q
+    assert np.allclose(np.transpose(A) @ dense @ B, 0) # off-diagonal block
+    combined = np.hstack([A, B])
+    assert np.allclose(np.transpose(combined) @ combined, np.eye(N))
+    blocks = np.zeros((N, N))
+    blocks[:N - Wdf_dim, :N - Wdf_dim] = affected
+    blocks[N - Wdf_dim:, N - Wdf_dim:] = free
+    assert np.allclose(combined @ blocks @ np.transpose(combined), dense)
+    sparse_blocks = solver.decouple_system(subspaces, W_df, N, sparse=True)
+    assert np.allclose(sparse_blocks[1].toarray(), free)
+
+
+def test_exact_blocks():
+    Q, V_0 = generators.star(5)
+    solver = dfs(Q, V_0, verbose=False)
+    Wdf_dim, W_df, subspaces = solver.solve("exact")
+    affected, free = solver.decouple_system(subspaces, W_df, 5, exact=True)
+    numeric = solver.decouple_system(subspaces, W_df, 5)
+    for exact, block in zip((affected, free), numeric):
+        assert exact == exact.T
+        values = sorted(float(value) for value, count in exact.eigenvals().items()
+                        for i in range(count))
+        assert np.allclose(values, np.linalg.eigvalsh(block))
@@ -0,0 +1,84 @@
+"""
+      Every engine must give the same W_df as the exact ones. Lattices with
+      noise at a corner are the hard case for the float engines: the
+      Krylov space has many directions with small components.
+"""
+
+from fractions import Fraction
+
+import numpy as np
+import pytest
+
+import generators
+from dfs import dfs
+
+
+def same_span(A, B):
+    A = np.asarray(A, dtype=float)
+    B = np.asarray(B, dtype=float)
+    rank = np.linalg.matrix_rank
+    return rank(A) == rank(B) == rank(np.vstack([A, B]))
+
+
+@pytest.mark.parametrize("shape, sparse", [((10, 10), True), ((20, 20), False),
+                                           ((20, 20), True)])
+def test_block_matches_modular_on_lattices(shape, sparse):
+    Q, V_0 = generators.lattice(shape, sparse=sparse)
+    Wdf_dim, W_df, subspaces = dfs(Q, V_0, verbose=False).solve("block")
+    assert Wdf_dim == dfs(Q, V_0, verbose=False).modular_dimension()
+    assert np.allclose(W_df @ subspaces.T, 0)
+
+
+@pytest.mark.parametrize("engine", ["block", "spectral"])
+def test_float_engines_match_exact(engine):
+    networks = [generators.random_sparse(12, degree=2, noise=(0, 5), seed=seed)
+                for seed in range(10)]
+    networks += [generators.ring(8), generators.star(7), generators.lattice((3, 5))]
+    for Q, V_0 in networks:
+        expected = dfs(Q, V_0, verbose=False).solve("exact")
+        found = dfs(Q, V_0, verbose=False).solve(engine)
+        assert found[0] == expected[0]
+        assert same_span(found[2], expected[2])
+
+
+def test_lanczos_dimension_matches_exact(tmp_path):
+    networks = [generators.random_sparse(15, degree=2, noise=(0, 6), seed=seed)
+                for seed in range(5)]
+    networks += [generators.lattice((5, 5), sparse=True), generators.ring(9)]
+    for i, (Q, V_0) in enumerate(networks):
+        Wdf_dim, W_df, subspaces = dfs(Q, V_0, verbose=False).solve("exact")
+        assert dfs(Q, V_0, verbose=False).lanczos_dimension() == Wdf_dim
+        path = str(tmp_path/("blocks%d.bin"%i))
+        assert dfs(Q, V_0, verbose=False).lanczos_dimension(stream=path) == Wdf_dim
+        blocks = np.fromfile(path).reshape(-1, Q.shape[0])
+        assert len(blocks) == Q.shape[0] - Wdf_dim
+        assert same_span(blocks, subspaces)
+
+
+@pytest.mark.parametrize("degree", [1, 2, 3])
+def test_modular_dimension_matches_exact(degree):
+    for seed in range(8):
+        Q, V_0 = generators.random_sparse(14, degree=degree, noise=(0, 3, 9), seed=seed)
+        expected = dfs(Q, V_0, verbose=False).solve("exact")[0]
+        assert dfs(Q, V_0, verbose=False).modular_dimension() == expected
+        assert dfs(Q, V_0[:1], verbose=False).modular_dimension(primes=1) == \
+            dfs(Q, V_0[:1], verbose=False).solve("exact")[0]
+
+
+def test_exact_propagation_is_exact():
+    Q, V_0 = generators.lattice((5, 5))
+    Wdf_dim, W_df, subspaces = dfs(Q, V_0, verbose=False).exact_propagation()
+    assert Wdf_dim == dfs(Q, V_0, verbose=False).modular_dimension() == 12
+    Z = subspaces.fractions()
+    # the float engine's limit_denominator cannot recover these entries
+    guessed = np.vectorize(lambda x: Fraction(float(x)).limit_denominator())(Z)
+    assert np.any(guessed != Z)
+    # the rows are exactly orthogonal and span a subspace invariant under Q
+    norms = [np.dot(z, z) for z in Z]
+    for i, z in enumerate(Z):
+        assert all(np.dot(z, Z[j]) == 0 for j in range(i))
+        residual = Q.astype(int).astype(object) @ z
+        for y, norm in zip(Z, norms):
+            residual = residual - (np.dot(residual, y)/norm)*y
+        assert np.all(residual == 0)
+    assert np.all(W_df.fractions() @ np.transpose(Z) == 0)
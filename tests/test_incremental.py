@@ -0,0 +1,77 @@
+"""
+      incremental_dfs must agree with the engines however the network is
+      built up.
+"""
+
+import numpy as np
+import pytest
+from scipy import sparse
+
+import generators
+from dfs import dfs
+from incremental import incremental_dfs
+
+
+def build(Q, V_0, noise_first):
+    edges = np.transpose(np.nonzero(np.triu(Q)))
+    state = incremental_dfs(n_nodes=Q.shape[0])
+    if noise_first:
+        for node in np.nonzero(V_0)[1]:
+            state.add_noise(int(node))
+    for (a, b) in edges:
+        state.add_edge(int(a), int(b))
+    if noise_first == False:
+        for node in np.nonzero(V_0)[1]:
+            state.add_noise(int(node))
+    return state
+
+
+def test_lattice_matches_modular():
+    Q, V_0 = generators.lattice((10, 10))
+    expected = dfs(Q, V_0, verbose=False).modular_dimension()
+    assert incremental_dfs(Q, V_0).Wdf_dim == expected
+    assert build(Q, V_0, noise_first=True).Wdf_dim == expected
+    assert build(Q, V_0, noise_first=False).Wdf_dim == expected
+
+
+def test_edits_match_exact():
+    for seed in range(10):
+        Q, V_0 = generators.random_sparse(10, degree=2, noise=(0, 3), seed=seed)
+        state = build(Q, V_0, noise_first=seed % 2 == 0)
+        Wdf_dim, W_df, subspaces = state.result()
+        expected = dfs(Q, V_0, verbose=False).solve("exact")
+        assert Wdf_dim == expected[0]
+        rank = np.linalg.matrix_rank
+        both = np.vstack([subspaces, np.asarray(expected[2], dtype=float)])
+        assert rank(subspaces) == rank(both)
+
+
+def test_rows_are_the_affected_subspace():
+    Q, V_0 = generators.lattice((12, 12))
+    state = incremental_dfs(Q, V_0)
+    expected = dfs(Q, V_0, verbose=False).modular_dimension()
+    assert state.size == Q.shape[0] - expected
+    state.add_edge(142, 131)
+    assert state.size == state.N - state.Wdf_dim
+
+
+@pytest.mark.parametrize("n", [100, 2000])
+def test_far_edit_is_cheap(n, monkeypatch):
+    Q, V_0 = generators.lattice((6, 6))
+    state = incremental_dfs(Q, V_0)
+    for node in range(36, 36 + n):
+        state.add_edge(node, node + 1)
+    before = state.Wdf_dim
+    calls = []
+    multiply = state.multiply
+    monkeypatch.setattr(state, "multiply", lambda v: calls.append(v.shape) or multiply(v))
+    state.add_edge(36 + n//2, 37 + n) # and adds a node
+    assert state.Wdf_dim == before + 1
+    assert calls == [] # neither the edit nor the query does any work
+
+
+@pytest.mark.parametrize("Q", [[[0, 1, 1], [1, 1, 0], [1, 0, 0]], [[0, 2, 0], [2, 0, 1], [0, 1, 0]]])
+def test_weighted_Q_is_rejected(Q):
+    for matrix in (np.array(Q), sparse.csr_matrix(Q)):
+        with pytest.raises(ValueError, match="coupling"):
+            incremental_dfs(matrix, [[1, 0, 0]])
@@ -0,0 +1,50 @@
+"""
+      Edge lists must be read line by line, and bad lines reported.
+"""
+
+import pytest
+
+import loaders
+
+
+def read(tmp_path, text):
+    path = tmp_path/"edges.txt"
+    path.write_bytes(text)
+    edges, noise = loaders.read_edge_list(str(path))
+    return edges.tolist(), noise.tolist()
+
+
+def test_formats(tmp_path):
+    assert read(tmp_path, b"0 1\n1 2\nnoise 0\n") == ([[0, 1], [1, 2]], [0])
+    assert read(tmp_path, b"0,1\n2,noise\n") == ([[0, 1]], [2])
+    assert read(tmp_path, b"% header\n0\t1 # comment\r\n\n3 4") == ([[0, 1], [3, 4]], [])
+    assert read(tmp_path, b"0 1 1\n2 3 1.0\n") == ([[0, 1], [2, 3]], [])
+    assert read(tmp_path, b"") == ([], [])
+
+
+@pytest.mark.parametrize("text, line", [(b"0 1 1\n2 3 2\n", 2), (b"0 1\n1 2 3 4\n", 2),
+                                        (b"0 1\n3\n", 2), (b"0 a\n", 1), (b"0 1\n-1 2\n", 2),
+                                        (b"0 1.5\n", 1), (b"noise noise\n", 1),
+                                        (b"0 1\nnoise5 3\n", 2)])
+def test_bad_lines(tmp_path, text, line):
+    with pytest.raises(ValueError, match="line %d:"%line):
+        read(tmp_path, text)
+
+
+def test_chunks(tmp_path, monkeypatch):
+    monkeypatch.setattr(loaders, "CHUNK", 64)
+    text = b"".join(b"%d %d\n"%(i, i + 1) for i in range(500)) + b"noise 7\n"
+    edges, noise = read(tmp_path, text)
+    assert edges == [[i, i + 1] for i in range(500)]
+    assert noise == [7]
+    with pytest.raises(ValueError, match="line 502:"):
+        read(tmp_path, text + b"x y\n")
+
+
+def test_labels_in_range(tmp_path):
+    path = tmp_path/"edges.txt"
+    path.write_bytes(b"0 1\n1 7\nnoise 0\n")
+    with pytest.raises(ValueError, match="from 0 to 4"):
+        loaders.load_network(str(path), n_nodes=5)
+    with pytest.raises(ValueError, match="from 0 to 7"):
+        loaders.load_network(str(path), noise=[-2])
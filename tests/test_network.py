@@ -0,0 +1,49 @@
+"""
+      The sparse Q built from a drawn network must equal the dense one.
+"""
+
+import numpy as np
+
+from network_to_matrix import network
+
+
+def drawn(size):
+    """
+    A size x size grid drawn as in the interface, with every coupling
+    drawn twice (once each way round) and noise at two corners.
+    """
+    positions = {(0, 0): "noise"}
+    for row in range(size):
+        for col in range(size):
+            positions[(row + 1, col + 1)] = len(positions) - 1
+    connections = []
+    for row in range(1, size + 1):
+        for col in range(1, size + 1):
+            for (x, y) in ((row + 1, col), (row, col + 1)):
+                if (x, y) in positions:
+                    connections.append((row, col, x, y))
+                    connections.append((x, y, row, col))
+    connections += [(0, 0, 1, 1), (size, size, 0, 0)]
+    return network(positions, connections)
+
+
+def test_sparse_matches_dense():
+    for size in (1, 2, 5):
+        net = drawn(size)
+        adjacent_pts, noise = net.adjacency()
+        dense = net.build_matrix(adjacent_pts)
+        sparse = net.build_matrix(adjacent_pts, sparse=True)
+        assert sparse.format == "csr"
+        assert np.array_equal(sparse.toarray(), dense)
+        assert np.sum(dense) == 4*size*(size - 1) # each coupling counted once
+        Q, V_0 = net.output_matrix(sparse=True)
+        assert np.array_equal(Q.toarray(), dense)
+        assert np.array_equal(np.nonzero(V_0)[1], [0, size*size - 1])
+
+
+def test_components():
+    positions = {(0, 0): "noise", (1, 1): 0, (1, 2): 1, (5, 5): 2, (5, 6): 3, (8, 8): 4}
+    connections = [(1, 1, 1, 2), (5, 5, 5, 6), (0, 0, 5, 6)]
+    parts = network(positions, connections).components()
+    assert [(nodes.tolist(), noise) for nodes, noise in parts] == \
+        [([0, 1], []), ([2, 3], [0]), ([4], [])]
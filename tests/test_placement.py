@@ -0,0 +1,47 @@
+"""
+      The placement search must find the same bests as trying every
+      placement.
+"""
+
+import itertools
+import numpy as np
+import pytest
+
+import generators
+from dfs import dfs
+from placement import greedy, branch_and_bound
+
+
+def brute_force(Q, candidates, size):
+    N = Q.shape[0]
+    frontier = []
+    for k in range(1, size + 1):
+        found = {}
+        for placement in itertools.combinations(candidates, k):
+            V_0 = np.zeros((k, N))
+            V_0[np.arange(k), list(placement)] = 1
+            found[placement] = dfs(Q, V_0, verbose=False).modular_dimension()
+        best = max(found.values())
+        frontier.append((k, best, sorted(p for p in found if found[p] == best)))
+    return frontier
+
+
+def test_branch_and_bound_on_lattice():
+    Q, V_0 = generators.lattice((10, 10))
+    candidates = list(range(0, 100, 7))
+    expected = brute_force(Q, candidates, 3)
+    assert branch_and_bound(Q, candidates, size=3, processes=1) == expected
+    assert branch_and_bound(Q, candidates, size=2, processes=2) == expected[:2]
+
+
+def test_greedy_on_lattice():
+    Q, V_0 = generators.lattice((10, 10))
+    assert greedy(Q, candidates=range(10), size=1) == [(1, 49, [(0,)])]
+
+
+def test_weighted_Q_is_rejected():
+    Q, V_0 = generators.ring(6)
+    with pytest.raises(ValueError, match="coupling"):
+        greedy(2*Q)
+    with pytest.raises(ValueError, match="coupling"):
+        branch_and_bound(Q + np.eye(6), processes=1) # frequencies on the diagonal
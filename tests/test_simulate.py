@@ -0,0 +1,44 @@
+"""
+      States in W_df must never be seen by the noise or leave W_df when
+      evolved, and other states must be.
+"""
+
+import numpy as np
+import pytest
+
+import generators
+from dfs import dfs
+from simulate import verify
+
+
+def test_wdf_states_are_protected():
+    Q, V_0 = generators.star(5, sparse=True)
+    Wdf_dim, W_df, subspaces = dfs(Q, V_0, verbose=False).solve("spectral")
+    assert Wdf_dim == 3
+    times = np.linspace(0, 20, 101)
+    result = verify(Q, V_0, W_df, times, chunksize=16)
+    assert result["decoherence_free"]
+    assert result["max_noise"] < 1e-8 and result["max_leakage"] < 1e-8
+    state = W_df[0] + 0.1*V_0[0]
+    result = verify(Q, V_0, W_df, times, states=state)
+    assert result["decoherence_free"] == False
+    assert result["max_noise"] > 0.05 and result["max_leakage"] > 0.05
+
+
+def test_no_wdf():
+    Q, V_0 = generators.chain(3)
+    Wdf_dim, W_df, subspaces = dfs(Q, V_0, verbose=False).solve("spectral")
+    assert W_df is None
+    times = [0.0, 0.5, 2.0, 3.0] # not equally spaced
+    result = verify(Q, V_0, W_df, times, states=np.eye(3)[2])
+    assert result["max_leakage"] is None
+    assert result["max_noise"] > 0.1 and result["decoherence_free"] == False
+    with pytest.raises(ValueError, match="no W_df"):
+        verify(Q, V_0, W_df, times)
+
+
+def test_no_times():
+    Q, V_0 = generators.star(5)
+    Wdf_dim, W_df, subspaces = dfs(Q, V_0, verbose=False).solve("spectral")
+    with pytest.raises(ValueError, match="no times"):
+        verify(Q, V_0, W_df, [])
@@ -0,0 +1,63 @@
+"""
+      Everything written to a result_store must be read back the same,
+      through memory maps, by a new store on the same directory.
+"""
+
+import json
+
+import numpy as np
+
+import generators
+from dfs import dfs
+from storage import ALIGN, result_store
+
+
+def test_round_trip(tmp_path):
+    Q, V_0 = generators.star(6, sparse=True)
+    result = dfs(Q, V_0, verbose=False).solve("spectral")
+    store = result_store(str(tmp_path))
+    assert store.append(Q, V_0, *result, metadata={"name": "star"}) == 0
+    chain, noise = generators.chain(3)
+    assert store.append(chain, noise, 0, None, np.eye(3)) == 1
+
+    store = result_store(str(tmp_path))
+    assert len(store) == 2
+    first, second = store
+    assert first["Wdf_dim"] == result[0] == 4
+    assert (first["Q"] != Q).nnz == 0
+    assert np.array_equal(first["V_0"], V_0)
+    assert np.array_equal(first["subspaces"], result[2])
+    assert isinstance(first["W_df"], np.memmap)
+    assert np.array_equal(first["W_df"][1:3], result[1][1:3])
+    assert first["metadata"]["name"] == "star"
+    assert second["W_df"] is None and second["Wdf_dim"] == 0
+    assert np.array_equal(second["subspaces"], np.eye(3))
+    assert np.array_equal(second["Q"].toarray(), chain)
+
+
+def test_extend_shares_Q(tmp_path):
+    Q, V_0 = generators.ring(8)
+    networks = [np.eye(8)[[node]] for node in range(3)]
+    results = [(i,) + dfs(Q, V, verbose=False).solve("spectral") for i, V in enumerate(networks)]
+    store = result_store(str(tmp_path))
+    assert store.extend(results[::-1], networks, Q=Q) == [0, 1, 2]
+    store = result_store(str(tmp_path))
+    offsets = [record["arrays"]["Q.data"][0] for record in store.records]
+    assert len(set(offsets)) == 1 # Q written once
+    for record in store:
+        index = record["metadata"]["batch_index"]
+        assert np.array_equal(record["V_0"], networks[index])
+        assert np.array_equal(record["Q"].toarray(), Q)
+        assert record["Wdf_dim"] == results[index][1]
+
+
+def test_alignment(tmp_path):
+    store = result_store(str(tmp_path))
+    for n in (3, 5, 7):
+        Q, V_0 = generators.chain(n)
+        store.append(Q, V_0, *dfs(Q, V_0, verbose=False).solve("spectral"))
+    with open(tmp_path/"index.jsonl") as file:
+        records = [json.loads(line) for line in file]
+    offsets = [entry[0] for record in records for entry in record["arrays"].values()]
+    assert len(offsets) > 10
+    assert all(offset % ALIGN == 0 for offset in offsets)
@@ -0,0 +1,50 @@
+"""
+      Every point of a sweep must give the same W_df as solving its Q
+      alone.
+"""
+
+import numpy as np
+
+import generators
+from dfs import dfs
+from sweep import coupling_stack, sweep
+
+
+def lattice_edges(n):
+    labels = np.arange(n*n).reshape(n, n)
+    return np.vstack([np.column_stack([labels[:, :-1].ravel(), labels[:, 1:].ravel()]),
+                      np.column_stack([labels[:-1].ravel(), labels[1:].ravel()])])
+
+
+def test_lattice_matches_modular():
+    Q, V_0 = generators.lattice((20, 20))
+    expected = dfs(Q, V_0, verbose=False).modular_dimension()
+    found = sweep(lattice_edges(20), [0], [1.0, 2.0], [0.0, 1.0])
+    assert found.tolist() == [expected, expected] # Q -> 2Q + I has the same W_df
+
+
+def test_points_match_exact():
+    rng = np.random.default_rng(0)
+    for trial in range(10):
+        N = int(rng.integers(3, 10))
+        edges = rng.integers(0, N, size=(12, 2))
+        weights = rng.integers(1, 3, size=(4, len(edges))).astype(float)
+        frequencies = rng.integers(0, 2, size=(4, N)).astype(float)
+        found, bases = sweep(edges, [0], weights, frequencies, n_nodes=N, bases=True)
+        Qs = coupling_stack(edges, N, weights, frequencies)
+        V_0 = np.eye(1, N)
+        for p in range(4):
+            assert np.allclose(Qs[p], Qs[p].T)
+            expected = dfs(Qs[p], V_0, verbose=False).solve("exact")
+            assert found[p] == expected[0]
+            W_df, subspaces = bases[p]
+            both = np.vstack([subspaces, np.asarray(expected[2], dtype=float)])
+            assert np.linalg.matrix_rank(both) == len(subspaces)
+            assert np.allclose(W_df @ subspaces.T, 0)
+
+
+def test_repeated_coupling_keeps_last_weight():
+    edges = [(0, 1), (1, 2), (1, 0), (2, 2), (2, 1), (0, 1)]
+    Qs = coupling_stack(edges, 3, [[1, 2, 3, 4, 5, 6], [6, 5, 4, 3, 2, 1]], [0.5, 0.0])
+    assert Qs[0].tolist() == [[0.5, 6, 0], [6, 0.5, 5], [0, 5, 0.5]]
+    assert Qs[1].tolist() == [[0, 1, 0], [1, 0, 2], [0, 2, 0]]
@@ -0,0 +1,59 @@
+"""
+      The symmetry reduction must give the same W_df as solving the whole
+      network, whichever engine runs on the quotient.
+"""
+
+import numpy as np
+import pytest
+
+import certify
+import generators
+import symmetry
+from dfs import dfs
+
+
+@pytest.mark.parametrize("shape, noise", [((15, 15), (7,)), ((20, 20), (0, 5))])
+def test_lattices_match_modular(shape, noise):
+    Q, V_0 = generators.lattice(shape, noise=noise)
+    expected = dfs(Q, V_0, verbose=False).modular_dimension()
+    assert dfs(Q, V_0, verbose=False).solve("symmetric")[0] == expected
+    assert dfs(Q, V_0, verbose=False).symmetric_propagation("block")[0] == expected
+
+
+@pytest.mark.parametrize("engine", ["spectral", "block", "exact"])
+def test_small_networks_match_exact(engine):
+    networks = [generators.ring(9), generators.star(8, noise=(1,)),
+                generators.lattice((4, 5), noise=(2,)), generators.complete(6)]
+    for Q, V_0 in networks:
+        expected = dfs(Q, V_0, verbose=False).solve("exact")[0]
+        assert dfs(Q, V_0, verbose=False).symmetric_propagation(engine)[0] == expected
+
+
+def test_no_noise():
+    Q, V_0 = generators.ring(6)
+    Wdf_dim, W_df, subspaces = dfs(Q, np.zeros((0, 6)), verbose=False).solve("symmetric")
+    assert Wdf_dim == 6
+    assert len(subspaces) == 0
+
+
+@pytest.mark.parametrize("network", [generators.star(7, noise=(3,)),
+                                     generators.lattice((5, 5)), generators.ring(8)])
+def test_unequal_cells(network, monkeypatch):
+    Q, V_0 = network
+    cells, B, A = symmetry.quotient(Q, V_0)
+    assert len(set(np.bincount(cells))) > 1 # so B is not symmetric
+    assert not np.allclose(B, np.transpose(B))
+    expected = dfs(Q, V_0, verbose=False).solve("exact")
+    events = []
+    hook = lambda event, data: events.append(data["passed"]) if event == "certificate" else None
+    for engine in ("certified", "exact"):
+        solver = dfs(Q, V_0, verbose=False, hooks=[hook])
+        Wdf_dim, W_df, subspaces = solver.symmetric_propagation(engine)
+        assert Wdf_dim == expected[0]
+        assert np.allclose(V_0 @ np.transpose(np.asarray(W_df, dtype=float)), 0)
+        both = np.vstack([np.asarray(subspaces, dtype=float), np.asarray(expected[2], dtype=float)])
+        assert np.linalg.matrix_rank(both) == len(subspaces)
+    assert events == [True] # checked against the whole of Q
+    monkeypatch.setattr(certify, "certified", lambda *args: None)
+    Wdf_dim, W_df, subspaces = dfs(Q, V_0, verbose=False).symmetric_propagation("certified")
+    assert Wdf_dim == expected[0] # from the exact engine on the quotient